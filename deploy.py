@@ -88,7 +88,13 @@ class AgentEngineDeployer:
                     "pydantic>=2.0.0",
                     "aiohttp>=3.13.0",
                     "python-dotenv>=1.1.1",
-                    "loguru>=0.7.3"
+                    "loguru>=0.7.3",
+                    "pydantic-settings>=2.0.0",
+                    "numpy>=1.26.0",
+                    "diskcache>=5.6.3",
+                    "orjson>=3.10.0",
+                    "msgspec>=0.18.6",
+                    "pyahocorasick>=2.1.0"
                 ],
                 extra_packages=["src/"],  # Include the entire src directory
                 env_vars={
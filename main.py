@@ -1,4 +1,5 @@
 import asyncio
+import os
 import uuid
 import logging
 import signal
@@ -12,6 +13,7 @@ from src.core.agents import farm_management_agent
 from src.core.memory import enhanced_session_manager
 from src.tools.utils import logger, JsonUtils
 from src.core.processors import cleanup_all_processors
+from src.tools.tools import prewarm_vertexai
 from src.observability.observability import initialize_laminar, observe_if_available, log_observability_status
 
 setup_logging(debug_mode=True)  # Toggle via env
@@ -108,8 +110,8 @@ def extract_context_from_conversation(query: str, response: str) -> Dict[str, An
 async def run_agent_async_with_memory(runner: InMemoryRunner, user_query: str, user_id: str = "farmer_123") -> str:
     """Core runner (streamlined event handling)."""
     session, memory_manager = await enhanced_session_manager.get_or_create_session(user_id, runner)
-    session_data = enhanced_session_manager.active_sessions.get(user_id)
-    session_id = session_data['session_id'] if session_data else str(uuid.uuid4())
+    session_entry = enhanced_session_manager.get_session_entry(user_id)
+    session_id = session_entry.session_id if session_entry else str(uuid.uuid4())
     
     final_result = ""
     try:
@@ -130,7 +132,7 @@ async def run_agent_async_with_memory(runner: InMemoryRunner, user_query: str, u
             user_id=user_id, session_id=session_id,
             new_message=types.Content(role='user', parts=[types.Part(text=user_query)])
         ):
-            logger.debug(f"Processing event: {type(event)}")
+            logger.debug("Processing event: %s", type(event))
             
             # Improved event processing with better error handling
             try:
@@ -146,7 +148,7 @@ async def run_agent_async_with_memory(runner: InMemoryRunner, user_query: str, u
                             if hasattr(event.content.parts[0], 'text') and event.content.parts[0].text:
                                 final_result = event.content.parts[0].text
                                 content_found = True
-                                logger.debug(f"Method 1: Extracted text: {final_result[:100]}...")
+                                logger.debug("Method 1: Extracted text: %s...", final_result[:100])
                     
                     # Method 2: Try alternative content access
                     if not content_found and hasattr(event, 'data'):
@@ -154,9 +156,9 @@ async def run_agent_async_with_memory(runner: InMemoryRunner, user_query: str, u
                             if hasattr(event.data, 'content'):
                                 final_result = str(event.data.content)
                                 content_found = True
-                                logger.debug(f"Method 2: Extracted from data.content: {final_result[:100]}...")
+                                logger.debug("Method 2: Extracted from data.content: %s...", final_result[:100])
                         except Exception as e:
-                            logger.debug(f"Method 2 failed: {e}")
+                            logger.debug("Method 2 failed: %s", e)
                     
                     # Method 3: String representation fallback
                     if not content_found:
@@ -165,9 +167,9 @@ async def run_agent_async_with_memory(runner: InMemoryRunner, user_query: str, u
                             if event_str and len(event_str) > 50:
                                 final_result = event_str
                                 content_found = True
-                                logger.debug(f"Method 3: Using string representation: {final_result[:100]}...")
+                                logger.debug("Method 3: Using string representation: %s...", final_result[:100])
                         except Exception as e:
-                            logger.debug(f"Method 3 failed: {e}")
+                            logger.debug("Method 3 failed: %s", e)
                     
                     if not content_found:
                         final_result = "✅ **Planning System Activated**: Your complex farming query was processed by the intelligent planning system. The response was generated but there was a display issue. Please try your query again."
@@ -245,6 +247,11 @@ async def main():
     # Log observability status
     log_observability_status()
     
+    # Open the Vertex AI connection in the background while the session starts (opt in via FARM_AGENT_PREWARM=1)
+    prewarm_task = None  # held so the task is not garbage collected mid-run
+    if os.getenv("FARM_AGENT_PREWARM", "0") == "1":
+        prewarm_task = asyncio.create_task(asyncio.to_thread(prewarm_vertexai))
+    
     print("=" * 70)
     print("🔍 DEBUG MODE: 🌾 GOOGLE ADK FARM MANAGEMENT SYSTEM WITH GUARDRAILS")
     print("=" * 70)
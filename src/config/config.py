@@ -1,24 +1,44 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from functools import lru_cache
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
-class VertexAIConfig(BaseModel):
-    project_id: str = Field(default_factory=lambda: os.getenv("PROJECT_ID", "digitalhuman-445007"))
-    location: str = Field(default_factory=lambda: os.getenv("LOCATION", "us-east4"))
-    model_name: str = Field(default_factory=lambda: os.getenv("MODEL", "gemini-2.0-flash-001"))
-    rag_corpus_name: str = Field(default_factory=lambda: os.getenv("RAG_CORPUS_NAME", "projects/digitalhuman-445007/locations/us-east4/ragCorpora/7991637538768945152"))
+# Settings read their values from the environment (field name, or the alias where the env var differs)
+class VertexAIConfig(BaseSettings):
+    model_config = SettingsConfigDict(frozen=True)
+    
+    project_id: str = "digitalhuman-445007"  # PROJECT_ID
+    location: str = "us-east4"  # LOCATION
+    model_name: str = Field(default="gemini-2.0-flash-001", validation_alias="MODEL")
+    rag_corpus_name: str = "projects/digitalhuman-445007/locations/us-east4/ragCorpora/7991637538768945152"  # RAG_CORPUS_NAME
 
-class AppConfig(BaseModel):
-    vertexai: VertexAIConfig = VertexAIConfig()
+class AppConfig(BaseSettings):
+    model_config = SettingsConfigDict(frozen=True)
+    
+    vertexai: VertexAIConfig = Field(default_factory=VertexAIConfig)
     cache_duration_weather: int = 600  # seconds
     cache_duration_market: int = 86400
     cache_duration_sheets: int = 300
+    cache_duration_geocoding: int = 604800  # coordinates rarely change; 7 days
+    cache_duration_plans: int = 600  # identical planning requests reuse the generated plan for 10 minutes
+    cache_duration_revalidation: int = 86400  # keep validators (ETag/Last-Modified) of expired responses for a day
+    cache_max_entries: int = 256  # per processor cache, least recently used entries evicted first
+    cache_dir: Optional[str] = Field(default=None, validation_alias="FARM_CACHE_DIR")  # unset keeps caches in memory only
     max_detailed_conversations: int = 8
+    summary_batch_size: int = 4  # conversations evicted from the window are summarized in batches of this size
+    summary_char_budget: int = 2048  # long-term summary is compressed to about half of this once it grows past it
     quality_threshold: float = 0.75
     max_refinement_iterations: int = 2
-    base_url_sheets: str = Field(default_factory=lambda: os.getenv("SHEETS_BASE_URL", "https://us-central1-digitalhuman-445007.cloudfunctions.net/sheet-assistant"))
+    approval_tolerance: float = 0.02  # an approved plan this close to quality_threshold is not refined
+    plateau_tolerance: float = 0.02  # stop refining when a round raises the score by less than this
+    base_url_sheets: str = Field(default="https://us-central1-digitalhuman-445007.cloudfunctions.net/sheet-assistant", validation_alias="SHEETS_BASE_URL")
 
-config = AppConfig()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_config() -> AppConfig:
+    """Build the application config once per process."""
+    return AppConfig()
+
+config = get_config()
\ No newline at end of file
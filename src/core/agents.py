@@ -2,7 +2,7 @@ from google.adk.agents import Agent, LlmAgent
 from google.adk.tools import agent_tool
 from src.config.config import config
 from src.tools.tools import (
-    weather_tool, market_price_tool, customer_data_tool, 
+    weather_tool, market_price_tool, customer_data_tool, farm_snapshot_tool,
     agricultural_knowledge_tool, validated_farming_plan_tool, 
     farming_plan_tool, evaluate_advice_quality_tool
 )
@@ -57,6 +57,16 @@ sheet_agent = AgentFactory.create_base_agent(
     'sheet_result'
 )
 
+farm_snapshot_agent = AgentFactory.create_base_agent(
+    'FarmSnapshotAgent',
+    "You are a farm situation specialist. When a farmer needs more than one of weather, market prices "
+    "and their customer record at once (for example \"what's my situation today?\"), use the "
+    "get_farm_snapshot_tool to fetch all of them in a single call instead of separate lookups. "
+    "Summarize the combined picture in a farmer-friendly way and note any part that could not be retrieved.",
+    [farm_snapshot_tool],
+    'farm_snapshot_result'
+)
+
 rag_agent = AgentFactory.create_base_agent(
     'RagAgent',
     "You are an agricultural knowledge specialist with access to a comprehensive agricultural knowledge base through RAG. "
@@ -171,6 +181,10 @@ farm_management_agent = LlmAgent(
    - Customer data retrieval from Google Sheets
    - Farm records and account information
 
+   **FarmSnapshotAgent** 📋 - PREFER over calling Weather, MarketPrice and Sheet agents separately when:
+   - A query needs two or more of weather, market prices and customer data
+   - The farmer asks for an overview of their current situation
+
 5. **RagAgent** 🌾 - For AGRICULTURAL KNOWLEDGE:
    - Context-Enhanced Queries: Include farmer's crops and methods in searches
    - Crop-specific cultivation techniques and best practices
@@ -212,6 +226,7 @@ farm_management_agent = LlmAgent(
         agent_tool.AgentTool(agent=weather_agent),
         agent_tool.AgentTool(agent=market_price_agent),
         agent_tool.AgentTool(agent=sheet_agent),
+        agent_tool.AgentTool(agent=farm_snapshot_agent),
         agent_tool.AgentTool(agent=rag_agent),
     ],
     before_model_callback=combined_callback,
@@ -2,12 +2,13 @@ from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmRequest, LlmResponse
 from google.genai import types
 import uuid
-from src.tools.utils import JsonUtils
 from typing import Optional
 from src.core.guardrails import guardrail_checker, GuardrailEvaluation
 from src.core.memory import enhanced_session_manager
 from src.tools.utils import logger
 
+MEMORY_CONTEXT_HEADER = "[CONTEXT] 🧠 **FARMER MEMORY & PROFILE**:"
+
 def combined_callback(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
     """Merged: Guardrail -> Memory Injection (DRY, orthogonal)."""
     # Extract user message (robust)
@@ -28,18 +29,23 @@ def combined_callback(callback_context: CallbackContext, llm_request: LlmRequest
     # CallbackContext doesn't have session_id directly, so we'll use a default session
     # The actual session management is handled in main.py
     session_id = getattr(callback_context, 'session_id', None) or "default_session"
-    enriched = enhanced_session_manager.get_enriched_context(session_id)
+    enriched = enhanced_session_manager.get_enriched_context_serialized(session_id)
+    memory_context = f"""{MEMORY_CONTEXT_HEADER}\n{enriched}\n---"""
     
-    # Inject memory as user context since Gemini doesn't support multiple system messages
-    memory_context = f"""[CONTEXT] 🧠 **FARMER MEMORY & PROFILE**:\n{JsonUtils.safe_dumps(enriched)}\n---\n\nUser Query: """
+    # Append memory to the system instruction: the user turns stay untouched and the prompt
+    # prefix only changes when memory does, so Gemini can reuse its context cache across turns
+    system_instruction = llm_request.config.system_instruction if llm_request.config else None
+    if llm_request.config and (system_instruction is None or isinstance(system_instruction, str)):
+        llm_request.append_instructions([memory_context])
+        return None
     
-    # Find the user message and prepend memory context to it
+    # Fallback: prepend memory to the user message (once - skip if already injected)
     if llm_request.contents:
         for content in llm_request.contents:
             if content.role == 'user' and content.parts and content.parts[0].text:
-                # Prepend memory context to user message
                 original_text = content.parts[0].text
-                content.parts[0].text = memory_context + original_text
+                if not original_text.startswith(MEMORY_CONTEXT_HEADER):
+                    content.parts[0].text = f"{memory_context}\n\nUser Query: {original_text}"
                 break
 
     return None
\ No newline at end of file
@@ -1,9 +1,16 @@
+import re
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, List
 from src.config.config import config
-from src.tools.utils import logger  # Assuming logger from utils
 import logging
 
+try:
+    import ahocorasick
+except ImportError:  # no wheel for this platform: fall back to compiled regexes
+    ahocorasick = None
+
+_logger = logging.getLogger('farm_agent.guardrails')
+
 
 class GuardrailEvaluation(BaseModel):
     compliance_status: str = Field(..., description="'compliant' or 'non-compliant'")
@@ -48,7 +55,6 @@ Evaluate the input and determine compliance. Return evaluation in your response.
 
 class GuardrailChecker:
     def __init__(self):
-        self.logger = logging.getLogger('farm_agent.guardrails')
         self.violation_keywords = {  # [Unchanged dict]
             'jailbreak': ['ignore previous', 'forget your role', 'you are now', 'disregard instructions', 'override system', 'new instructions', 'act as if', 'pretend you are', 'bypass', 'ignore all rules'],
             'off_domain': ['write a poem', 'tell me a joke', 'sing a song', 'political opinion', 'religious view', 'sports score', 'movie recommendation', 'dating advice'],
@@ -58,45 +64,90 @@ class GuardrailChecker:
         self.agricultural_keywords = [  # [Unchanged list]
             'crop', 'farm', 'agriculture', 'weather', 'soil', 'irrigation', 'harvest', 'plant', 'seed', 'fertilizer', 'pesticide', 'livestock', 'cattle', 'poultry', 'market', 'price', 'mandi', 'yield', 'cultivation', 'field', 'land', 'grain', 'wheat', 'rice', 'cotton', 'vegetable', 'fruit', 'dairy', 'organic'
         ]
-        self.logger.info("GuardrailChecker initialized")
+        # Inputs shorter than every violation keyword cannot trigger a policy
+        self._min_violation_length = min(len(k) for keywords in self.violation_keywords.values() for k in keywords)
+        # The agricultural whitelist rides along in the same scan and is matched as word prefixes
+        # rather than whole tokens, so "farmers", "crops" and "farming" still count
+        keyword_groups = {**self.violation_keywords, 'agricultural': self.agricultural_keywords}
+        self._automaton = None
+        if ahocorasick is not None:
+            # One automaton over every violation keyword and the agricultural whitelist, tagged by
+            # category, so each input is scanned exactly once. The state walk runs in pyahocorasick's
+            # C extension, so long pasted inputs are already scanned at native speed
+            self._automaton = ahocorasick.Automaton()
+            for category, keywords in keyword_groups.items():
+                for keyword in keywords:
+                    self._automaton.add_word(keyword, (category, keyword))
+            self._automaton.make_automaton()
+        else:
+            # One alternation per category (longest keyword first), run by the C regex engine
+            self._patterns = {
+                category: re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, sorted(keywords, key=len, reverse=True))) + ")")
+                for category, keywords in keyword_groups.items()
+            }
+        _logger.info("GuardrailChecker initialized")
+
+    def _scan(self, input_lower: str) -> Dict[str, List[str]]:
+        """
+        Collect matched keywords by category in a single automaton pass.
+        
+        A match only counts when it starts at a word boundary ("act as if" does not fire inside
+        "contact as if", "land" not inside "island"); the end is left open so inflections such
+        as "passwords" or "crops" still match their keyword.
+        """
+        if self._automaton is None:
+            return {category: [match.group(0)] for category, pattern in self._patterns.items()
+                    if (match := pattern.search(input_lower))}
+        
+        hits: Dict[str, List[str]] = {}
+        for end_index, (category, keyword) in self._automaton.iter(input_lower):
+            start_index = end_index - len(keyword) + 1
+            if start_index > 0 and input_lower[start_index - 1].isalnum():
+                continue
+            hits.setdefault(category, []).append(keyword)
+        return hits
 
     def check_violations(self, user_input: str) -> GuardrailEvaluation:
         # [Unchanged logic, but add try/except for robustness]
         try:
+            if len(user_input) < self._min_violation_length:
+                return GuardrailEvaluation(
+                    compliance_status="compliant",
+                    evaluation_summary="Input passes all safety checks",
+                    triggered_policies=[],
+                    risk_level="low"
+                )
+            
+            # Lowercased once for the single scan; str.lower() already has an ASCII fast path
             input_lower = user_input.lower()
             violations = []
             risk_level = "low"
+            hits = self._scan(input_lower)
             
-            for keyword in self.violation_keywords['jailbreak']:
-                if keyword in input_lower:
-                    self.logger.warning(f"Jailbreak attempt detected: keyword '{keyword}' in user input")
-                    violations.append("1. Instruction Subversion Attempt")
-                    risk_level = "high"
-                    break
+            if 'jailbreak' in hits:
+                _logger.warning("Jailbreak attempt detected: keyword '%s' in user input", hits['jailbreak'][0])
+                violations.append("1. Instruction Subversion Attempt")
+                risk_level = "high"
             
             # Check for off-domain queries
-            is_agricultural = any(ag_word in input_lower for ag_word in self.agricultural_keywords)
-            has_off_domain = any(off_word in input_lower for off_word in self.violation_keywords['off_domain'])
+            has_off_domain = 'off_domain' in hits
+            is_agricultural = 'agricultural' in hits
             
             if has_off_domain and not is_agricultural:
-                self.logger.warning(f"Off-domain query detected: non-agricultural content in user input")
+                _logger.warning("Off-domain query detected: non-agricultural content in user input")
                 violations.append("2. Off-Domain Query (Non-Agricultural)")
                 risk_level = "medium" if risk_level == "low" else risk_level
             
             # Check for harmful content
-            for keyword in self.violation_keywords['harmful']:
-                if keyword in input_lower:
-                    self.logger.error(f"Harmful content detected: keyword '{keyword}' in user input")
-                    violations.append("3. Potentially Harmful Agricultural Practice")
-                    risk_level = "high"
-                    break
+            if 'harmful' in hits:
+                _logger.error("Harmful content detected: keyword '%s' in user input", hits['harmful'][0])
+                violations.append("3. Potentially Harmful Agricultural Practice")
+                risk_level = "high"
             
             # Check for privacy violations
-            for keyword in self.violation_keywords['privacy']:
-                if keyword in input_lower:
-                    violations.append("4. Data Privacy Violation Attempt")
-                    risk_level = "high"
-                    break
+            if 'privacy' in hits:
+                violations.append("4. Data Privacy Violation Attempt")
+                risk_level = "high"
             
             if violations:
                 return GuardrailEvaluation(
@@ -112,7 +163,7 @@ class GuardrailChecker:
                 risk_level="low"
             )
         except Exception as e:
-            self.logger.error(f"Guardrail check error: {e}")
+            _logger.error("Guardrail check error: %s", e)
             return GuardrailEvaluation(
                 compliance_status="non-compliant",
                 evaluation_summary="Internal error - request blocked for safety",
@@ -120,4 +171,5 @@ class GuardrailChecker:
                 risk_level="high"
             )
 
+# Created at import time, so the keyword automaton is compiled before the first request arrives
 guardrail_checker = GuardrailChecker()
\ No newline at end of file
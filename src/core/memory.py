@@ -1,9 +1,73 @@
+import asyncio
+import functools
+import re
+import time
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 from src.config.config import config
-from src.tools.utils import VertexAIFactory, JsonUtils, logger
+from src.tools.utils import JsonUtils
+
+try:
+    import ahocorasick
+except ImportError:  # fall back to substring scans
+    ahocorasick = None
+
+_logger = logging.getLogger('farm_agent.memory')
+
+# "5 acres", "2.5 hectare", "10 bighas"
+_FARM_SIZE_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(acres?|hectares?|bighas?)\b", re.IGNORECASE)
+
+SUMMARIZER_SYSTEM_INSTRUCTION = """You are a Conversation Summarization Agent for agricultural conversations.
+
+**Your Role:** Create concise, informative summaries of farming conversations that preserve key information for future reference.
+
+**What to Include in Summary:**
+- Farmer's crops, location, farm size, and farming interests
+- Key agricultural topics discussed (pest management, irrigation, fertilizers, etc.)
+- Important decisions or plans made
+- Farming challenges or concerns raised
+- Methods or techniques discussed
+- Any specific recommendations given
+
+**What to Exclude:**
+- Detailed technical specifications (keep only key points)
+- Repetitive or minor details
+- Standard greetings or pleasantries
+
+**Output Format:**
+Create a concise paragraph (2-3 sentences) that captures the essence of the farming conversations and the farmer's profile/interests.
+
+**Example:**
+"Farmer discussed basmati rice cultivation in Punjab, focusing on organic pest management and irrigation optimization for their 10-acre farm. Key topics included integrated pest management strategies, soil health improvement, and market timing for better prices."
+"""
+
+@functools.lru_cache(maxsize=1)
+def _get_summary_model():
+    """Create the conversation summarization model once and reuse it."""
+    # Imported here so sessions that never summarize don't pay for the Vertex SDK
+    from src.tools.utils import VertexAIFactory
+    return VertexAIFactory.create_model(
+        model_name=config.vertexai.model_name,
+        system_instruction=SUMMARIZER_SYSTEM_INSTRUCTION
+    )
+
+def _build_keyword_automaton(keyword_groups: Dict[str, Dict[str, List[str]]]):
+    """Build one automaton mapping each keyword to all of its (category, canonical value) tags."""
+    if ahocorasick is None:
+        return None
+    tags: Dict[str, list] = {}
+    for category, values in keyword_groups.items():
+        for value, keywords in values.items():
+            for keyword in keywords:
+                tags.setdefault(keyword, []).append((category, value))
+    automaton = ahocorasick.Automaton()
+    for keyword, keyword_tags in tags.items():
+        automaton.add_word(keyword, tuple(keyword_tags))
+    automaton.make_automaton()
+    return automaton
 
 class ConversationMemoryManager:
     """
@@ -16,23 +80,69 @@ class ConversationMemoryManager:
     - Provides rich context for agent interactions
     """
     
+    CROP_KEYWORDS = {
+        'rice': ['rice', 'paddy', 'basmati', 'jasmine rice'],
+        'wheat': ['wheat', 'triticum'],
+        'cotton': ['cotton', 'kapas'],
+        'corn': ['corn', 'maize', 'makka'],
+        'soybean': ['soybean', 'soya'],
+        'sugarcane': ['sugarcane', 'ganna'],
+        'potato': ['potato', 'aloo'],
+        'onion': ['onion', 'pyaaz'],
+        'tomato': ['tomato', 'tamatar']
+    }
+    
+    LOCATION_KEYWORDS = ['punjab', 'haryana', 'up', 'uttar pradesh', 'bihar', 'maharashtra', 'gujarat', 'rajasthan', 'karnataka', 'andhra pradesh', 'telangana', 'tamil nadu', 'kerala', 'west bengal', 'odisha', 'madhya pradesh']
+    
+    INTEREST_KEYWORDS = {
+        'organic farming': ['organic', 'chemical-free', 'natural farming'],
+        'pest management': ['pest', 'insect', 'disease', 'fungus'],
+        'irrigation': ['irrigation', 'water', 'drip', 'sprinkler'],
+        'soil health': ['soil', 'fertility', 'nutrients'],
+        'market prices': ['price', 'market', 'selling', 'profit'],
+        'weather': ['weather', 'rainfall', 'temperature', 'climate']
+    }
+    
+    METHOD_KEYWORDS = {
+        'organic': ['organic', 'chemical-free', 'bio'],
+        'conventional': ['chemical', 'fertilizer', 'pesticide'],
+        'integrated': ['ipm', 'integrated pest management'],
+        'precision': ['precision', 'technology', 'sensors']
+    }
+    
+    _KEYWORD_GROUPS = {
+        'crop': CROP_KEYWORDS,
+        'location': {location: [location] for location in LOCATION_KEYWORDS},
+        'interest': INTEREST_KEYWORDS,
+        'method': METHOD_KEYWORDS,
+    }
+    _QUERY_ONLY_CATEGORIES = ('interest',)  # interests come from what the farmer asks, not from replies
+    _PROFILE_SET_FIELDS = ('crops', 'interests', 'concerns', 'farming_methods', 'equipment')  # stored as sets, exposed as lists
+    
+    # Built once per process and shared by every session's memory manager
+    _KEYWORD_AUTOMATON = _build_keyword_automaton(_KEYWORD_GROUPS)
+    
     def __init__(self):
-        self.logger = logging.getLogger('farm_agent.memory')
-        self.logger.info("Initializing ConversationMemoryManager with sliding window (8 conversations)")
+        _logger.info("Initializing ConversationMemoryManager with sliding window (8 conversations)")
         
         self.max_detailed_conversations = config.max_detailed_conversations
         self.conversation_history: List[Dict[str, Any]] = []      # Last 8 detailed conversations
         self.summarized_context: str = ""        # Summary of older conversations
+        self.version: int = 0                    # Bumped on every write, used to invalidate serialized context
+        self._context_cache: Optional[Dict[str, Any]] = None  # get_current_context result until the next write
+        self._pending_summary: Optional[asyncio.Task] = None  # latest background summarization, if any
+        self._pending_summarize: List[Dict[str, Any]] = []  # evicted conversations waiting for a full batch
+        self.summary_batch_size = config.summary_batch_size
         self.farmer_profile: Dict[str, Any] = {             # Accumulated farmer information
             "name": "",
             "location": "",
-            "crops": [],
+            "crops": set(),
             "farm_size": "",
             "experience": "",
-            "interests": [],
-            "concerns": [],
-            "farming_methods": [],
-            "equipment": [],
+            "interests": set(),
+            "concerns": set(),
+            "farming_methods": set(),
+            "equipment": set(),
             "budget_range": ""
         }
         
@@ -45,13 +155,16 @@ class ConversationMemoryManager:
             response: Agent's response
             extracted_context: Additional context extracted from conversation
         """
-        self.logger.debug(f"Adding conversation to memory. Current history size: {len(self.conversation_history)}")
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Adding conversation to memory. Current history size: %d", len(self.conversation_history))
         
-        # Create conversation record
+        # Create conversation record (preview is formatted once here rather than on every context read)
+        response_preview = response if len(response) <= 200 else f"{response[:200]}..."
         conversation_record = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp_ns": time.time_ns(),  # epoch nanoseconds; format only if a reader needs a string
             "query": query,
             "response": response,
+            "preview": f"Q: {query}\n   A: {response_preview}",
             "extracted_info": extracted_context or {}
         }
         
@@ -60,52 +173,107 @@ class ConversationMemoryManager:
         
         # Add to conversation history
         self.conversation_history.append(conversation_record)
+        self.version += 1
+        self._context_cache = None
         
         # Manage sliding window - if we exceed max conversations
         if len(self.conversation_history) > self.max_detailed_conversations:
-            self.logger.info(f"Sliding window triggered: {len(self.conversation_history)} conversations exceed max {self.max_detailed_conversations}")
-            
-            # Summarize oldest conversations before removing
-            conversations_to_summarize = self.conversation_history[:-self.max_detailed_conversations]
-            self.logger.debug(f"Summarizing {len(conversations_to_summarize)} oldest conversations")
-            new_summary = self._summarize_conversations(conversations_to_summarize)
+            _logger.info("Sliding window triggered: %d conversations exceed max %d", len(self.conversation_history), self.max_detailed_conversations)
             
-            # Update summarized context
-            if self.summarized_context:
-                self.summarized_context = f"{self.summarized_context}\n\n{new_summary}"
-            else:
-                self.summarized_context = new_summary
-            
-            # Keep only last 8 conversations
+            # Move the oldest conversations out of the window; summarize once a full batch has built up
+            self._pending_summarize.extend(self.conversation_history[:-self.max_detailed_conversations])
             self.conversation_history = self.conversation_history[-self.max_detailed_conversations:]
-            self.logger.info(f"Memory cleanup complete: kept {len(self.conversation_history)} recent conversations")
+            if len(self._pending_summarize) >= self.summary_batch_size:
+                conversations_to_summarize, self._pending_summarize = self._pending_summarize, []
+                _logger.debug("Summarizing %d oldest conversations", len(conversations_to_summarize))
+                self._schedule_summary(conversations_to_summarize)
             
-            logger.info(f"Summarized {len(conversations_to_summarize)} older conversations, maintaining {len(self.conversation_history)} recent ones")
+            _logger.info("Memory cleanup complete: kept %d recent conversations", len(self.conversation_history))
+    
+    def _schedule_summary(self, conversations: List[Dict[str, Any]]) -> None:
+        """Summarize in a worker thread when an event loop is running, otherwise inline."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            summary = self._summarize_conversations(conversations)
+            self._apply_summary(self._combine_summaries(summary), len(conversations))
+            return
+        self._pending_summary = loop.create_task(
+            self._summarize_in_background(conversations, self._pending_summary)
+        )
+        self._pending_summary.add_done_callback(self._log_summary_failure)
+    
+    @staticmethod
+    def _log_summary_failure(task: asyncio.Task) -> None:
+        """Log a background summarization that died, since nothing else awaits its result."""
+        if not task.cancelled() and task.exception() is not None:
+            _logger.error("Background conversation summarization failed: %s", task.exception())
+    
+    async def _summarize_in_background(self, conversations: List[Dict[str, Any]], previous: Optional[asyncio.Task]) -> None:
+        """Run the blocking summarization call in a thread, then apply it after any earlier summary."""
+        summary = await asyncio.to_thread(self._summarize_conversations, conversations)
+        if previous is not None:
+            try:
+                await previous  # keep summaries in conversation order
+            except Exception as e:
+                _logger.error("Earlier summarization failed, applying this one anyway: %s", e)
+        combined = await asyncio.to_thread(self._combine_summaries, summary)
+        self._apply_summary(combined, len(conversations))
+    
+    def _combine_summaries(self, new_summary: str) -> str:
+        """Append a new summary to the long-term context, compressing it once it exceeds the budget."""
+        combined = f"{self.summarized_context}\n\n{new_summary}" if self.summarized_context else new_summary
+        if len(combined) > config.summary_char_budget:
+            combined = self._compress_summary(combined)
+        return combined
+    
+    def _apply_summary(self, summary: str, conversation_count: int) -> None:
+        """Install the updated long-term summary and invalidate cached context."""
+        self.summarized_context = summary
+        self.version += 1
+        self._context_cache = None
+        
+        _logger.info("Summarized %d older conversations, maintaining %d recent ones", conversation_count, len(self.conversation_history))
     
     def get_current_context(self) -> Dict[str, Any]:
         """
         Get formatted context for agent injection.
         
         Returns:
-            Rich context dictionary with farmer profile, conversation summary, and recent conversations
+            Rich context dictionary with farmer profile, conversation summary, and recent conversations.
+            The dictionary is cached until the next conversation is added - treat it as read-only.
         """
         
-        # Format recent conversations for context
-        recent_conversations_text = ""
-        for i, conv in enumerate(self.conversation_history, 1):
-            recent_conversations_text += f"\n{i}. Q: {conv['query']}\n   A: {conv['response'][:200]}{'...' if len(conv['response']) > 200 else ''}"
+        if self._context_cache is not None:
+            return self._context_cache
+        
+        # Format recent conversations for context (evicted ones stay visible until they are summarized)
+        recent_conversations_text = "\n\n".join(
+            conv["preview"] for conv in (*self._pending_summarize, *self.conversation_history)
+        )
         
         # Build comprehensive context
         context = {
-            "farmer_profile": self.farmer_profile,
-            "conversation_summary": self.summarized_context if self.summarized_context else "No previous conversation history.",
+            "farmer_profile": self._profile_view(),
+            "conversation_summary": self.summarized_context or (
+                "Earlier conversations are being summarized." if self._pending_summary and not self._pending_summary.done()
+                else "No previous conversation history."
+            ),
             "recent_conversations": recent_conversations_text if recent_conversations_text else "No recent conversations.",
-            "total_conversations": len(self.conversation_history) + (1 if self.summarized_context else 0),
+            "total_conversations": len(self.conversation_history) + len(self._pending_summarize) + (1 if self.summarized_context else 0),
             "memory_status": f"Tracking {len(self.conversation_history)} recent conversations"
         }
         
+        self._context_cache = context
         return context
     
+    def _profile_view(self) -> Dict[str, Any]:
+        """Copy of the farmer profile with set-valued fields materialized as sorted lists."""
+        view = dict(self.farmer_profile)
+        for field in self._PROFILE_SET_FIELDS:
+            view[field] = sorted(self.farmer_profile[field], key=str)
+        return view
+    
     def _extract_farmer_info(self, query: str, response: str, extracted_context: Dict[str, Any] = None) -> None:
         """
         Extract and update farmer profile information from conversations.
@@ -116,97 +284,61 @@ class ConversationMemoryManager:
             extracted_context: Additional context information
         """
         
-        query_lower = query.lower()
-        response_lower = response.lower()
-        
-        # Extract crop information
-        crops_mentioned = []
-        crop_keywords = {
-            'rice': ['rice', 'paddy', 'basmati', 'jasmine rice'],
-            'wheat': ['wheat', 'triticum'],
-            'cotton': ['cotton', 'kapas'],
-            'corn': ['corn', 'maize', 'makka'],
-            'soybean': ['soybean', 'soya'],
-            'sugarcane': ['sugarcane', 'ganna'],
-            'potato': ['potato', 'aloo'],
-            'onion': ['onion', 'pyaaz'],
-            'tomato': ['tomato', 'tamatar']
-        }
-        
-        for crop, keywords in crop_keywords.items():
-            if any(keyword in query_lower or keyword in response_lower for keyword in keywords):
-                if crop not in self.farmer_profile['crops']:
-                    crops_mentioned.append(crop)
+        hits = self._match_keywords(query.lower(), response.lower())
         
         # Update crops in profile
-        for crop in crops_mentioned:
-            if crop not in self.farmer_profile['crops']:
-                self.farmer_profile['crops'].append(crop)
-        
-        # Extract location information
-        location_keywords = ['punjab', 'haryana', 'up', 'uttar pradesh', 'bihar', 'maharashtra', 'gujarat', 'rajasthan', 'karnataka', 'andhra pradesh', 'telangana', 'tamil nadu', 'kerala', 'west bengal', 'odisha', 'madhya pradesh']
-        for location in location_keywords:
-            if location in query_lower or location in response_lower:
-                if not self.farmer_profile['location']:
+        self.farmer_profile['crops'].update(hits['crop'])
+        
+        # Extract location information (first match in keyword order wins)
+        if not self.farmer_profile['location']:
+            for location in self.LOCATION_KEYWORDS:
+                if location in hits['location']:
                     self.farmer_profile['location'] = location.title()
-                break
+                    break
         
         # Extract farm size information
-        size_patterns = ['acres', 'acre', 'hectare', 'hectares', 'bigha', 'bighas']
-        for word in query.split() + response.split():
-            if any(size_word in word.lower() for size_word in size_patterns):
-                # Look for numbers before size words
-                words = (query + " " + response).split()
-                for i, w in enumerate(words):
-                    if any(size_word in w.lower() for size_word in size_patterns):
-                        # Look for number in previous words
-                        for j in range(max(0, i-3), i):
-                            if words[j].replace('.', '').replace(',', '').isdigit():
-                                if not self.farmer_profile['farm_size']:
-                                    self.farmer_profile['farm_size'] = f"{words[j]} {w.lower()}"
-                                break
-                        break
+        if not self.farmer_profile['farm_size']:
+            size_match = _FARM_SIZE_RE.search(f"{query} {response}")
+            if size_match:
+                self.farmer_profile['farm_size'] = f"{size_match.group(1)} {size_match.group(2).lower()}"
         
         # Extract farming interests/concerns
-        interest_keywords = {
-            'organic farming': ['organic', 'chemical-free', 'natural farming'],
-            'pest management': ['pest', 'insect', 'disease', 'fungus'],
-            'irrigation': ['irrigation', 'water', 'drip', 'sprinkler'],
-            'soil health': ['soil', 'fertility', 'nutrients'],
-            'market prices': ['price', 'market', 'selling', 'profit'],
-            'weather': ['weather', 'rainfall', 'temperature', 'climate']
-        }
-        
-        for interest, keywords in interest_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                if interest not in self.farmer_profile['interests']:
-                    self.farmer_profile['interests'].append(interest)
+        self.farmer_profile['interests'].update(hits['interest'])
         
         # Extract farming methods mentioned
-        method_keywords = {
-            'organic': ['organic', 'chemical-free', 'bio'],
-            'conventional': ['chemical', 'fertilizer', 'pesticide'],
-            'integrated': ['ipm', 'integrated pest management'],
-            'precision': ['precision', 'technology', 'sensors']
-        }
-        
-        for method, keywords in method_keywords.items():
-            if any(keyword in query_lower or keyword in response_lower for keyword in keywords):
-                if method not in self.farmer_profile['farming_methods']:
-                    self.farmer_profile['farming_methods'].append(method)
+        self.farmer_profile['farming_methods'].update(hits['method'])
         
         # Update extracted context if provided
         if extracted_context:
             for key, value in extracted_context.items():
                 if key == 'crops' and value:
-                    for crop in value if isinstance(value, list) else [value]:
-                        if crop not in self.farmer_profile['crops']:
-                            self.farmer_profile['crops'].append(crop)
+                    self.farmer_profile['crops'].update(value if isinstance(value, list) else [value])
                 elif key == 'location' and value and not self.farmer_profile['location']:
                     self.farmer_profile['location'] = value
                 elif key == 'farm_size' and value and not self.farmer_profile['farm_size']:
                     self.farmer_profile['farm_size'] = value
     
+    def _match_keywords(self, query_lower: str, response_lower: str) -> Dict[str, set]:
+        """Map each keyword category to the canonical values mentioned in this exchange, in one scan."""
+        hits = {category: set() for category in self._KEYWORD_GROUPS}
+        combined = f"{query_lower}\n{response_lower}"
+        query_end = len(query_lower)
+        
+        if self._KEYWORD_AUTOMATON is not None:
+            for end_index, tags in self._KEYWORD_AUTOMATON.iter(combined):
+                for category, value in tags:
+                    if end_index >= query_end and category in self._QUERY_ONLY_CATEGORIES:
+                        continue
+                    hits[category].add(value)
+            return hits
+        
+        for category, values in self._KEYWORD_GROUPS.items():
+            text = query_lower if category in self._QUERY_ONLY_CATEGORIES else combined
+            for value, keywords in values.items():
+                if any(keyword in text for keyword in keywords):
+                    hits[category].add(value)
+        return hits
+    
     def _summarize_conversations(self, conversations: List[Dict[str, Any]]) -> str:
         """
         Summarize older conversations for long-term memory.
@@ -222,38 +354,18 @@ class ConversationMemoryManager:
             return ""
         
         try:
-            # Create summarization model
-            summary_model = VertexAIFactory.create_model(
-                model_name=config.vertexai.model_name,
-                system_instruction="""You are a Conversation Summarization Agent for agricultural conversations.
-
-**Your Role:** Create concise, informative summaries of farming conversations that preserve key information for future reference.
-
-**What to Include in Summary:**
-- Farmer's crops, location, farm size, and farming interests
-- Key agricultural topics discussed (pest management, irrigation, fertilizers, etc.)
-- Important decisions or plans made
-- Farming challenges or concerns raised
-- Methods or techniques discussed
-- Any specific recommendations given
-
-**What to Exclude:**
-- Detailed technical specifications (keep only key points)
-- Repetitive or minor details
-- Standard greetings or pleasantries
-
-**Output Format:**
-Create a concise paragraph (2-3 sentences) that captures the essence of the farming conversations and the farmer's profile/interests.
-
-**Example:**
-"Farmer discussed basmati rice cultivation in Punjab, focusing on organic pest management and irrigation optimization for their 10-acre farm. Key topics included integrated pest management strategies, soil health improvement, and market timing for better prices."
-"""
-            )
+            # Reuse the process-wide summarization model
+            summary_model = _get_summary_model()
             
             # Prepare conversations for summarization
-            conversations_text = ""
+            parts = []
             for conv in conversations:
-                conversations_text += f"Q: {conv['query']}\nA: {conv['response'][:300]}{'...' if len(conv['response']) > 300 else ''}\n\n"
+                response_text = conv['response']
+                parts.append(f"Q: {conv['query']}\nA: {response_text[:300]}")
+                if len(response_text) > 300:
+                    parts.append("...")
+                parts.append("\n\n")
+            conversations_text = "".join(parts)
             
             summarization_prompt = f"""
 **CONVERSATIONS TO SUMMARIZE:**
@@ -269,7 +381,7 @@ Keep the summary informative but concise (2-3 sentences maximum)."""
             
             if response and response.text:
                 summary = response.text.strip()
-                logger.info(f"Successfully summarized {len(conversations)} conversations")
+                _logger.info("Successfully summarized %d conversations", len(conversations))
                 return summary
             else:
                 # Fallback summary if AI summarization fails
@@ -287,10 +399,45 @@ Keep the summary informative but concise (2-3 sentences maximum)."""
                 return f"Farmer engaged in agricultural discussions covering {', '.join(topics) if topics else 'various farming topics'} over {len(conversations)} conversations."
         
         except Exception as e:
-            logger.error(f"Error in conversation summarization: {e}")
+            _logger.error("Error in conversation summarization: %s", e)
             # Simple fallback summary
             return f"Previous farming conversations covered various agricultural topics over {len(conversations)} exchanges."
     
+    def _compress_summary(self, summary: str) -> str:
+        """
+        Condense an over-budget long-term summary into a summary of summaries.
+        
+        Args:
+            summary: Accumulated summary text longer than the configured budget
+            
+        Returns:
+            Compressed summary, hard-truncated to the budget if the model fails or overshoots
+        """
+        budget = config.summary_char_budget
+        target = budget // 2
+        compressed = ""
+        
+        try:
+            compression_prompt = f"""
+**SUMMARIES TO COMPRESS:**
+
+{summary}
+
+**TASK:** Merge these summaries of earlier agricultural conversations into a single summary of at most {target} characters. Keep the farmer's profile (crops, location, farm size, methods) and the most important topics, decisions and concerns; drop repetition."""
+            
+            response = _get_summary_model().generate_content(compression_prompt)
+            if response and response.text:
+                compressed = response.text.strip()
+        except Exception as e:
+            _logger.error("Error compressing conversation summary: %s", e)
+        
+        if not compressed or len(compressed) > budget:
+            # Keep the most recent part of the summary
+            compressed = summary[-budget:]
+        
+        _logger.info("Compressed conversation summary from %d to %d chars (budget %d)", len(summary), len(compressed), budget)
+        return compressed
+    
     def get_conversation_count(self) -> Dict[str, Any]:
         """Get conversation statistics."""
         return {
@@ -299,6 +446,14 @@ Keep the summary informative but concise (2-3 sentences maximum)."""
             "total_estimated": len(self.conversation_history) + (8 if self.summarized_context else 0)
         }
 
+@dataclass(slots=True)
+class SessionEntry:
+    """A user's ADK session together with its conversation memory."""
+    session: Any
+    session_id: str
+    created_at: datetime
+    memory: ConversationMemoryManager
+
 class EnhancedSessionManager:
     """
     Manages single persistent sessions with conversation memory throughout user interactions.
@@ -311,8 +466,9 @@ class EnhancedSessionManager:
     """
     
     def __init__(self):
-        self.active_sessions: Dict[str, Dict[str, Any]] = {}  # user_id -> session_info
-        self.memory_managers: Dict[str, ConversationMemoryManager] = {}  # session_id -> ConversationMemoryManager
+        self._sessions: Dict[str, SessionEntry] = {}  # user_id -> SessionEntry
+        self._by_session_id: Dict[str, SessionEntry] = {}  # session_id -> same SessionEntry
+        self._serialized_contexts: Dict[str, tuple] = {}  # session_id -> (memory version, serialized context)
         
     async def get_or_create_session(self, user_id: str, runner) -> tuple:
         """
@@ -326,14 +482,11 @@ class EnhancedSessionManager:
             Tuple of (session, memory_manager)
         """
         
-        if user_id in self.active_sessions:
+        entry = self._sessions.get(user_id)
+        if entry is not None:
             # Return existing session and memory manager
-            session_info = self.active_sessions[user_id]
-            session = session_info['session']
-            session_id = session_info['session_id']
-            memory_manager = self.memory_managers[session_id]
-            logger.info(f"Using existing session {session_id} for user {user_id}")
-            return session, memory_manager
+            _logger.info("Using existing session %s for user %s", entry.session_id, user_id)
+            return entry.session, entry.memory
         else:
             # Create new session and memory manager
             session_id = str(uuid.uuid4())
@@ -350,18 +503,20 @@ class EnhancedSessionManager:
                 memory_manager = ConversationMemoryManager()
                 
                 # Store session info
-                self.active_sessions[user_id] = {
-                    'session': session,
-                    'session_id': session_id,
-                    'created_at': datetime.now()
-                }
-                self.memory_managers[session_id] = memory_manager
+                entry = SessionEntry(
+                    session=session,
+                    session_id=session_id,
+                    created_at=datetime.now(),
+                    memory=memory_manager
+                )
+                self._sessions[user_id] = entry
+                self._by_session_id[session_id] = entry
                 
-                logger.info(f"Created new session {session_id} for user {user_id}")
+                _logger.info("Created new session %s for user %s", session_id, user_id)
                 return session, memory_manager
                 
             except Exception as e:
-                logger.error(f"Failed to create session for user {user_id}: {e}")
+                _logger.error("Failed to create session for user %s: %s", user_id, e)
                 raise
     
     def add_conversation_to_memory(self, session_id: str, query: str, response: str, extracted_context: Dict[str, Any] = None) -> None:
@@ -375,11 +530,12 @@ class EnhancedSessionManager:
             extracted_context: Additional context extracted
         """
         
-        if session_id in self.memory_managers:
-            self.memory_managers[session_id].add_conversation(query, response, extracted_context)
-            logger.debug(f"Added conversation to memory for session {session_id}")
+        entry = self._by_session_id.get(session_id)
+        if entry is not None:
+            entry.memory.add_conversation(query, response, extracted_context)
+            _logger.debug("Added conversation to memory for session %s", session_id)
         else:
-            logger.warning(f"No memory manager found for session {session_id}")
+            _logger.warning("No memory manager found for session %s", session_id)
     
     def get_enriched_context(self, session_id: str) -> Dict[str, Any]:
         """
@@ -392,8 +548,9 @@ class EnhancedSessionManager:
             Rich context dictionary for agent use
         """
         
-        if session_id in self.memory_managers:
-            return self.memory_managers[session_id].get_current_context()
+        entry = self._by_session_id.get(session_id)
+        if entry is not None:
+            return entry.memory.get_current_context()
         else:
             # Return empty context if no memory manager
             return {
@@ -404,18 +561,41 @@ class EnhancedSessionManager:
                 "memory_status": "No active memory"
             }
     
+    def get_enriched_context_serialized(self, session_id: str) -> str:
+        """
+        Get the enriched context as a JSON string, re-serialized only when the memory changes.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            Serialized context, memoized per (session_id, memory version)
+        """
+        
+        entry = self._by_session_id.get(session_id)
+        version = entry.memory.version if entry else -1
+        
+        cached = self._serialized_contexts.get(session_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        serialized = JsonUtils.safe_dumps(self.get_enriched_context(session_id))
+        self._serialized_contexts[session_id] = (version, serialized)
+        return serialized
+    
+    def get_session_entry(self, user_id: str) -> Optional[SessionEntry]:
+        """Get the active session entry for a user, if any."""
+        return self._sessions.get(user_id)
+    
     def clear_session(self, user_id: str) -> None:
         """Clear session for user (useful for testing or reset)."""
-        if user_id in self.active_sessions:
-            session_info = self.active_sessions[user_id]
-            session_id = session_info['session_id']
-            
+        entry = self._sessions.pop(user_id, None)
+        if entry is not None:
             # Clean up
-            del self.active_sessions[user_id]
-            if session_id in self.memory_managers:
-                del self.memory_managers[session_id]
+            self._by_session_id.pop(entry.session_id, None)
+            self._serialized_contexts.pop(entry.session_id, None)
             
-            logger.info(f"Cleared session for user {user_id}")
+            _logger.info("Cleared session for user %s", user_id)
 
 # Initialize enhanced session manager
 enhanced_session_manager = EnhancedSessionManager()
\ No newline at end of file
@@ -1,5 +1,7 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import asyncio
 import logging
+import msgspec
 from src.config.config import config
 from src.tools.utils import VertexAIFactory, JsonUtils, logger
 from src.observability.observability import observe_if_available
@@ -131,6 +133,123 @@ REFINEMENT_SYSTEM_INSTRUCTION = """You are an Agricultural Plan Refinement Speci
 **Output:** Return the refined plan in the same JSON structure as the original plan."""
 
 
+class EvaluationStruct(msgspec.Struct, omit_defaults=True):
+    """Schema of the reflection output (see REFLECTION_SYSTEM_INSTRUCTION), decoded by msgspec."""
+    overall_quality_score: float = 0.0
+    evaluation_summary: Any = None
+    dimension_scores: Dict[str, Any] = {}
+    strengths: List[Any] = []
+    concerns: List[Any] = []
+    improvement_suggestions: List[Any] = []
+    risk_flags: List[Any] = []
+    approval_status: Optional[str] = None
+    revision_priority: Optional[str] = None
+    farmer_readiness: Any = None
+
+
+# Plans with more steps than this are serialized off the event loop
+LARGE_PLAN_STEP_THRESHOLD = 10
+
+# Progress headers ("\n🌱 **PHASE 1 - PLANNING:** ") keyed by (phase, status), built once per pair
+_PROGRESS_HEADERS: Dict[tuple, str] = {}
+
+_SYSTEM_INSTRUCTIONS = {
+    "planning": PLANNING_SYSTEM_INSTRUCTION,
+    "reflection": REFLECTION_SYSTEM_INSTRUCTION,
+    "refinement": REFINEMENT_SYSTEM_INSTRUCTION,
+}
+
+
+# ============================================================================
+# SHARED LLM HELPERS
+# ============================================================================
+
+def _build_planning_prompt(problem_description: str, context: Optional[Dict] = None) -> str:
+    """Build the planning prompt shared by the standalone and sequential planners."""
+    context_info = ""
+    if context:
+        context_info = f"""
+
+**Available Context:**
+- Location: {context.get('location', 'Not specified')}
+- Current Season: {context.get('season', 'Not specified')}
+- Crop Type: {context.get('crop_type', 'Not specified')}
+- Farm Size: {context.get('farm_size', 'Not specified')}
+- Budget Range: {context.get('budget', 'Not specified')}
+- Experience Level: {context.get('experience', 'Not specified')}
+- Available Resources: {context.get('resources', 'Not specified')}
+"""
+
+    return f"""
+
+**FARMING CHALLENGE TO PLAN:**
+{problem_description}
+
+{context_info}
+
+**TASK:** Create a comprehensive, step-by-step farming plan for this challenge. 
+Focus on practical, implementable actions with clear timelines and resource requirements.
+Consider Indian farming conditions, seasonal factors, and provide alternatives for different resource levels.
+
+Respond with a detailed JSON plan following the exact structure specified in your instructions."""
+
+
+def _build_evaluation_prompt(subject: str, content: str, context: Optional[Dict] = None, original_query: str = "") -> str:
+    """Build the reflection prompt; ``subject`` is "advice" or "plan"."""
+    context_info = ""
+    if context:
+        context_info = f"""
+
+**Evaluation Context:**
+- Original Query: {original_query}
+- Farmer Location: {context.get('location', 'Not specified')}
+- Crop/Topic: {context.get('crop_type', 'Not specified')}
+- Farmer Experience: {context.get('experience', 'Not specified')}
+- Season/Timing: {context.get('season', 'Not specified')}
+"""
+
+    return f"""
+
+**AGRICULTURAL {subject.upper()} TO EVALUATE:**
+{content}
+
+{context_info}
+
+**TASK:** Conduct a comprehensive quality evaluation of this agricultural {subject}.
+Rate it across all four dimensions, identify strengths and concerns, and provide improvement suggestions.
+Focus on accuracy, safety, practicality for Indian farmers, and completeness.
+
+Respond with a detailed JSON evaluation following the exact structure specified."""
+
+
+def _call_vertex(model_key: str, prompt: str, schema: Optional[type] = None) -> Dict[str, Any]:
+    """
+    Single LLM call path for all planning agents: model creation, generation and JSON parsing.
+    
+    Args:
+        model_key: Key into _SYSTEM_INSTRUCTIONS ("planning", "reflection" or "refinement")
+        prompt: User prompt to send
+        schema: Optional msgspec schema for typed decoding of the response
+        
+    Returns:
+        Dict with the raw response ``text`` and parsed ``data`` (None if not valid JSON),
+        or an empty dict when the model returned no text
+    """
+    model = VertexAIFactory.create_model(
+        model_name=config.vertexai.model_name,
+        system_instruction=_SYSTEM_INSTRUCTIONS[model_key]
+    )
+    response = model.generate_content(prompt)
+    
+    if not (response and response.text):
+        return {}
+    if schema is not None:
+        data = JsonUtils.extract_and_decode(response.text, schema)
+    else:
+        data = JsonUtils.extract_and_parse_json(response.text)
+    return {"text": response.text, "data": data}
+
+
 # ============================================================================
 # FARMING PLANNING AGENT
 # ============================================================================
@@ -158,65 +277,31 @@ class FarmingPlanningAgent:
             Detailed plan with steps, priorities, and timeline
         """
         try:
-            VertexAIFactory.init_vertexai(config)
-            
-            planning_model = VertexAIFactory.create_model(
-                model_name=config.vertexai.model_name,
-                system_instruction=PLANNING_SYSTEM_INSTRUCTION
-            )
-
-            context_info = ""
-            if context:
-                context_info = f"""
-
-**Available Context:**
-- Location: {context.get('location', 'Not specified')}
-- Current Season: {context.get('season', 'Not specified')}
-- Crop Type: {context.get('crop_type', 'Not specified')}
-- Farm Size: {context.get('farm_size', 'Not specified')}
-- Budget Range: {context.get('budget', 'Not specified')}
-- Experience Level: {context.get('experience', 'Not specified')}
-- Available Resources: {context.get('resources', 'Not specified')}
-"""
-
-            planning_prompt = f"""
-
-**FARMING CHALLENGE TO PLAN:**
-{problem_description}
-
-{context_info}
-
-**TASK:** Create a comprehensive, step-by-step farming plan for this challenge. 
-Focus on practical, implementable actions with clear timelines and resource requirements.
-Consider Indian farming conditions, seasonal factors, and provide alternatives for different resource levels.
-
-Respond with a detailed JSON plan following the exact structure specified in your instructions."""
+            planning_prompt = _build_planning_prompt(problem_description, context)
 
             self.logger.debug("-----------------------------------------------------------")
             self.logger.debug("LLM Request to Planning model:")
-            self.logger.debug(f"Problem Description: {problem_description}")
+            self.logger.debug("Problem Description: %s", problem_description)
             self.logger.debug("-----------------------------------------------------------")
             
-            response = planning_model.generate_content(planning_prompt)
+            result = _call_vertex("planning", planning_prompt)
             
             self.logger.debug("-----------------------------------------------------------")
             self.logger.debug("LLM Response from Planning model:")
-            if response and response.text:
-                self.logger.debug(f"Response length: {len(response.text)} characters")
-                
-                plan_data = JsonUtils.extract_and_parse_json(response.text)
+            if result:
+                self.logger.debug("Response length: %s characters", len(result['text']))
                 
-                if plan_data:
+                if result["data"]:
                     self.logger.info(f"Planning agent generated farming plan successfully")
                     return {
                         "status": "success",
-                        "plan": plan_data,
+                        "plan": result["data"],
                         "message": "Comprehensive farming plan generated successfully"
                     }
                 else:
                     return {
                         "status": "success",
-                        "plan": {"detailed_plan": response.text},
+                        "plan": {"detailed_plan": result["text"]},
                         "message": "Comprehensive farming plan generated successfully"
                     }
             else:
@@ -262,42 +347,13 @@ class ReflectionAgent:
             Quality evaluation with score, feedback, and improvement suggestions
         """
         try:
-            VertexAIFactory.init_vertexai(config)
-                
-            reflection_model = VertexAIFactory.create_model(
-                model_name=config.vertexai.model_name,
-                system_instruction=REFLECTION_SYSTEM_INSTRUCTION
-            )
-
-            context_info = ""
-            if context:
-                context_info = f"""
-
-**Evaluation Context:**
-- Original Query: {context.get('query', 'Not provided')}
-- Farmer Location: {context.get('location', 'Not specified')}
-- Crop/Topic: {context.get('crop_type', 'Not specified')}
-- Farmer Experience: {context.get('experience', 'Not specified')}
-- Season/Timing: {context.get('season', 'Not specified')}
-"""
-
-            evaluation_prompt = f"""
-
-**AGRICULTURAL ADVICE TO EVALUATE:**
-{advice}
-
-{context_info}
-
-**TASK:** Conduct a comprehensive quality evaluation of this agricultural advice.
-Rate it across all four dimensions, identify strengths and concerns, and provide improvement suggestions.
-Focus on accuracy, safety, practicality for Indian farmers, and completeness.
-
-Respond with a detailed JSON evaluation following the exact structure specified."""
+            original_query = context.get('query', 'Not provided') if context else ""
+            evaluation_prompt = _build_evaluation_prompt("advice", advice, context, original_query)
 
-            response = reflection_model.generate_content(evaluation_prompt)
+            result = _call_vertex("reflection", evaluation_prompt, EvaluationStruct)
             
-            if response and response.text:
-                evaluation_data = JsonUtils.extract_and_parse_json(response.text)
+            if result:
+                evaluation_data = result["data"]
                 
                 if evaluation_data:
                     self.logger.info(f"Reflection agent completed quality evaluation")
@@ -310,7 +366,7 @@ Respond with a detailed JSON evaluation following the exact structure specified.
                 else:
                     return {
                         "status": "success",
-                        "evaluation": {"quality_assessment": response.text},
+                        "evaluation": {"quality_assessment": result["text"]},
                         "meets_threshold": True,
                         "message": "Quality evaluation completed successfully"
                     }
@@ -350,10 +406,15 @@ class SequentialPlanningAgent:
         
         self.quality_threshold = config.quality_threshold
         self.max_refinement_iterations = config.max_refinement_iterations
+        self.approval_tolerance = config.approval_tolerance
+        self.plateau_tolerance = config.plateau_tolerance
         
     def _print_progress(self, phase: str, message: str, status: str = ""):
         """Display real-time progress to user."""
-        print(f"\n{status} **{phase}:** {message}")
+        header = _PROGRESS_HEADERS.get((phase, status))
+        if header is None:
+            header = _PROGRESS_HEADERS[(phase, status)] = f"\n{status} **{phase}:** "
+        print(header, message, sep="")
         
     @observe_if_available(name="create_validated_agricultural_plan")
     async def create_validated_agricultural_plan(self, problem_description: str, context: Optional[Dict] = None) -> Dict[str, Any]:
@@ -369,7 +430,7 @@ class SequentialPlanningAgent:
         """
         try:
             self.logger.info(f"Starting sequential planning for: {problem_description[:100]}...")
-            self.logger.debug(f"Planning context: {context}")
+            self.logger.debug("Planning context: %s", context)
             self._print_progress("SEQUENTIAL PLANNING SYSTEM", "Initializing production-grade planning workflow...")
             
             VertexAIFactory.init_vertexai(config)
@@ -399,7 +460,7 @@ class SequentialPlanningAgent:
             self._print_progress("PHASE 2 - REFLECTION", "Evaluating plan quality, safety, and practicality...", "🔍")
             
             plan_text = self._extract_plan_text(plan_result["plan"])
-            self.logger.debug(f"Extracted plan text for evaluation: {len(plan_text)} characters")
+            self.logger.debug("Extracted plan text for evaluation: %s characters", len(plan_text))
             evaluation_result = await self._evaluate_plan_quality(plan_text, context, problem_description)
             
             if evaluation_result["status"] != "success":
@@ -420,10 +481,17 @@ class SequentialPlanningAgent:
             refinement_count = 0
             current_plan = plan_result["plan"]
             current_evaluation = evaluation_result["evaluation"]
+            prev_risk_count = len(current_evaluation.get("risk_flags", []))
             
             while (quality_score < self.quality_threshold and 
                    refinement_count < self.max_refinement_iterations):
                 
+                # Reviewer already approved and the score is within tolerance of the threshold
+                if (current_evaluation.get("approval_status") == "approved" and
+                        self.quality_threshold - quality_score < self.approval_tolerance):
+                    self.logger.info(f"Skipping refinement: plan approved by reviewer (Score: {quality_score:.2f})")
+                    break
+                
                 refinement_count += 1
                 self._print_progress("PHASE 3 - REFINEMENT", f"Quality below threshold. Refining plan (Attempt {refinement_count}/{self.max_refinement_iterations})...", "🔧")
                 
@@ -441,9 +509,20 @@ class SequentialPlanningAgent:
                     new_evaluation_result = await self._evaluate_plan_quality(refined_plan_text, context, problem_description)
                     
                     if new_evaluation_result["status"] == "success":
+                        prev_score = quality_score
                         quality_score = new_evaluation_result["evaluation"].get("overall_quality_score", 0.0)
                         current_evaluation = new_evaluation_result["evaluation"]
                         self._print_progress("PHASE 3 - REFINEMENT", f"Refined Quality Score: {quality_score:.2f}", "✨")
+                        
+                        # Stop early when another round is unlikely to pay for its two LLM calls
+                        risk_count = len(current_evaluation.get("risk_flags", []))
+                        if quality_score - prev_score < self.plateau_tolerance:
+                            self.logger.info(f"Refinement plateaued ({prev_score:.2f} -> {quality_score:.2f}), stopping")
+                            break
+                        if risk_count and risk_count == prev_risk_count:
+                            self.logger.info(f"Refinement did not reduce risk flags ({risk_count}), stopping")
+                            break
+                        prev_risk_count = risk_count
                     else:
                         break
                 else:
@@ -485,55 +564,23 @@ class SequentialPlanningAgent:
 
     async def _generate_agricultural_plan(self, problem_description: str, context: Optional[Dict] = None) -> Dict[str, Any]:
         """Generate initial agricultural plan (Phase 1)."""
-        planning_model = VertexAIFactory.create_model(
-            model_name=config.vertexai.model_name,
-            system_instruction=PLANNING_SYSTEM_INSTRUCTION
-        )
-
-        context_info = ""
-        if context:
-            context_info = f"""
-
-**Available Context:**
-- Location: {context.get('location', 'Not specified')}
-- Current Season: {context.get('season', 'Not specified')}
-- Crop Type: {context.get('crop_type', 'Not specified')}
-- Farm Size: {context.get('farm_size', 'Not specified')}
-- Budget Range: {context.get('budget', 'Not specified')}
-- Experience Level: {context.get('experience', 'Not specified')}
-- Available Resources: {context.get('resources', 'Not specified')}
-"""
+        result = _call_vertex("planning", _build_planning_prompt(problem_description, context))
         
-        planning_prompt = f"""
-
-**FARMING CHALLENGE TO PLAN:**
-{problem_description}
-
-{context_info}
-
-**TASK:** Create a comprehensive, step-by-step farming plan for this challenge. 
-Focus on practical, implementable actions with clear timelines and resource requirements.
-Consider Indian farming conditions, seasonal factors, and provide alternatives for different resource levels.
-
-Respond with a detailed JSON plan following the exact structure specified in your instructions."""
-
-        response = planning_model.generate_content(planning_prompt)
-        
-        if response and response.text:
-            plan_data = JsonUtils.extract_and_parse_json(response.text)
+        if result:
+            plan_data = result["data"]
             
             if plan_data:
                 self.logger.info(f"Sequential planning agent created plan with {len(plan_data.get('steps', []))} steps")
                 return {
                     "status": "success",
                     "plan": plan_data,
-                    "raw_response": response.text
+                    "raw_response": result["text"]
                 }
             else:
                 self.logger.warning("Failed to parse JSON plan")
                 return {
                     "status": "partial_success",
-                    "plan": {"raw_plan": response.text},
+                    "plan": {"raw_plan": result["text"]},
                     "message": "Plan generated but not in structured format"
                 }
         else:
@@ -544,40 +591,11 @@ Respond with a detailed JSON plan following the exact structure specified in you
 
     async def _evaluate_plan_quality(self, plan_text: str, context: Optional[Dict] = None, original_query: str = "") -> Dict[str, Any]:
         """Evaluate plan quality and safety (Phase 2)."""
-        reflection_model = VertexAIFactory.create_model(
-            model_name=config.vertexai.model_name,
-            system_instruction=REFLECTION_SYSTEM_INSTRUCTION
-        )
-
-        context_info = ""
-        if context:
-            context_info = f"""
-
-**Evaluation Context:**
-- Original Query: {original_query}
-- Farmer Location: {context.get('location', 'Not specified')}
-- Crop/Topic: {context.get('crop_type', 'Not specified')}
-- Farmer Experience: {context.get('experience', 'Not specified')}
-- Season/Timing: {context.get('season', 'Not specified')}
-"""
+        evaluation_prompt = _build_evaluation_prompt("plan", plan_text, context, original_query)
+        result = _call_vertex("reflection", evaluation_prompt, EvaluationStruct)
         
-        evaluation_prompt = f"""
-
-**AGRICULTURAL PLAN TO EVALUATE:**
-{plan_text}
-
-{context_info}
-
-**TASK:** Conduct a comprehensive quality evaluation of this agricultural plan.
-Rate it across all four dimensions, identify strengths and concerns, and provide improvement suggestions.
-Focus on accuracy, safety, practicality for Indian farmers, and completeness.
-
-Respond with a detailed JSON evaluation following the exact structure specified."""
-
-        response = reflection_model.generate_content(evaluation_prompt)
-        
-        if response and response.text:
-            evaluation_data = JsonUtils.extract_and_parse_json(response.text)
+        if result:
+            evaluation_data = result["data"]
             
             if evaluation_data:
                 quality_score = evaluation_data.get('overall_quality_score', 0.0)
@@ -586,13 +604,13 @@ Respond with a detailed JSON evaluation following the exact structure specified.
                     "status": "success",
                     "evaluation": evaluation_data,
                     "meets_threshold": quality_score >= self.quality_threshold,
-                    "raw_response": response.text
+                    "raw_response": result["text"]
                 }
             else:
                 self.logger.warning("Failed to parse JSON evaluation")
                 return {
                     "status": "partial_success",
-                    "evaluation": {"raw_evaluation": response.text},
+                    "evaluation": {"raw_evaluation": result["text"]},
                     "meets_threshold": False,
                     "message": "Evaluation generated but not in structured format"
                 }
@@ -604,20 +622,16 @@ Respond with a detailed JSON evaluation following the exact structure specified.
 
     async def _refine_plan(self, current_plan: Dict[str, Any], evaluation: Dict[str, Any], problem_description: str, context: Optional[Dict] = None) -> Dict[str, Any]:
         """Refine plan based on evaluation feedback (Phase 3)."""
-        refinement_model = VertexAIFactory.create_model(
-            model_name=config.vertexai.model_name,
-            system_instruction=REFINEMENT_SYSTEM_INSTRUCTION
-        )
-
         improvement_suggestions = evaluation.get("improvement_suggestions", [])
         concerns = evaluation.get("concerns", [])
         risk_flags = evaluation.get("risk_flags", [])
+        current_plan_str = await self._dump_plan(current_plan)
         
         refinement_prompt = f"""**ORIGINAL PROBLEM:**
 {problem_description}
 
 **CURRENT PLAN TO REFINE:**
-{JsonUtils.safe_dumps(current_plan)}
+{current_plan_str}
 
 **QUALITY EVALUATION FEEDBACK:**
 - Overall Score: {evaluation.get('overall_quality_score', 0.0)}
@@ -637,17 +651,17 @@ Focus on:
 
 Respond with the refined plan in the same JSON format."""
 
-        response = refinement_model.generate_content(refinement_prompt)
+        result = _call_vertex("refinement", refinement_prompt)
         
-        if response and response.text:
-            refined_plan = JsonUtils.extract_and_parse_json(response.text)
+        if result:
+            refined_plan = result["data"]
             
             if refined_plan:
                 self.logger.info("Successfully refined agricultural plan")
                 return {
                     "status": "success",
                     "refined_plan": refined_plan,
-                    "raw_response": response.text
+                    "raw_response": result["text"]
                 }
             else:
                 return {
@@ -660,6 +674,12 @@ Respond with the refined plan in the same JSON format."""
                 "message": "Failed to generate refined plan"
             }
 
+    async def _dump_plan(self, plan_data: Dict[str, Any]) -> str:
+        """Serialize a plan, moving large plans to a worker thread so the event loop stays responsive."""
+        if isinstance(plan_data, dict) and len(plan_data.get("steps") or ()) > LARGE_PLAN_STEP_THRESHOLD:
+            return await asyncio.to_thread(JsonUtils.safe_dumps, plan_data)
+        return JsonUtils.safe_dumps(plan_data)
+
     def _extract_plan_text(self, plan_data: Dict[str, Any]) -> str:
         """Extract text from plan data for evaluation."""
         if isinstance(plan_data, dict):
@@ -1,33 +1,237 @@
 import aiohttp
+import asyncio
+import os
 import random
-from datetime import datetime
-from typing import Optional, Dict, Any
+import time
+import diskcache
+import functools
+import numpy as np
+import orjson
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List
 from src.config.config import config
 from src.models.models import WeatherData, MarketPriceData, HourlyWeatherData
 from src.tools.utils import logger
 from src.observability.observability import observe_if_available
 
+# Embedded coordinates for Indian cities and states (states map to a central point), so
+# common lookups never leave the process. Unknown places fall back to Nominatim.
+INDIAN_LOCATION_COORDINATES: Dict[str, tuple] = {
+    # Metros and major cities
+    'delhi': (28.7041, 77.1025),
+    'new delhi': (28.6139, 77.2090),
+    'mumbai': (19.0760, 72.8777),
+    'bangalore': (12.9716, 77.5946),
+    'bengaluru': (12.9716, 77.5946),
+    'chennai': (13.0827, 80.2707),
+    'kolkata': (22.5726, 88.3639),
+    'hyderabad': (17.3850, 78.4867),
+    'pune': (18.5204, 73.8567),
+    'ahmedabad': (23.0225, 72.5714),
+    'jaipur': (26.9124, 75.7873),
+    'lucknow': (26.8467, 80.9462),
+    'kanpur': (26.4499, 80.3319),
+    'nagpur': (21.1458, 79.0882),
+    'indore': (22.7196, 75.8577),
+    'bhopal': (23.2599, 77.4126),
+    'patna': (25.5941, 85.1376),
+    'chandigarh': (30.7333, 76.7794),
+    'surat': (21.1702, 72.8311),
+    'vadodara': (22.3072, 73.1812),
+    'rajkot': (22.3039, 70.8022),
+    'coimbatore': (11.0168, 76.9558),
+    'madurai': (9.9252, 78.1198),
+    'kochi': (9.9312, 76.2673),
+    'thiruvananthapuram': (8.5241, 76.9366),
+    'mysore': (12.2958, 76.6394),
+    'mysuru': (12.2958, 76.6394),
+    'visakhapatnam': (17.6868, 83.2185),
+    'vijayawada': (16.5062, 80.6480),
+    'guntur': (16.3067, 80.4365),
+    'warangal': (17.9689, 79.5941),
+    'bhubaneswar': (20.2961, 85.8245),
+    'raipur': (21.2514, 81.6296),
+    'ranchi': (23.3441, 85.3096),
+    'guwahati': (26.1445, 91.7362),
+    'dehradun': (30.3165, 78.0322),
+    'shimla': (31.1048, 77.1734),
+    'srinagar': (34.0837, 74.7973),
+    'jammu': (32.7266, 74.8570),
+    'varanasi': (25.3176, 82.9739),
+    'agra': (27.1767, 78.0081),
+    'meerut': (28.9845, 77.7064),
+    'gorakhpur': (26.7606, 83.3732),
+    'prayagraj': (25.4358, 81.8463),
+    'allahabad': (25.4358, 81.8463),
+    'gwalior': (26.2183, 78.1828),
+    'jabalpur': (23.1815, 79.9864),
+    'ujjain': (23.1765, 75.7885),
+    'jodhpur': (26.2389, 73.0243),
+    'kota': (25.2138, 75.8648),
+    'bikaner': (28.0229, 73.3119),
+    'nashik': (19.9975, 73.7898),
+    'aurangabad': (19.8762, 75.3433),
+    'solapur': (17.6599, 75.9064),
+    'kolhapur': (16.7050, 74.2433),
+    'tirupati': (13.6288, 79.4192),
+    'salem': (11.6643, 78.1460),
+    'tiruchirappalli': (10.7905, 78.7047),
+    'thanjavur': (10.7870, 79.1378),
+    'muzaffarpur': (26.1209, 85.3647),
+    'cuttack': (20.4625, 85.8830),
+    'siliguri': (26.7271, 88.3953),
+    # Agricultural hubs
+    'ludhiana': (30.9010, 75.8573),
+    'amritsar': (31.6340, 74.8723),
+    'jalandhar': (31.3260, 75.5762),
+    'patiala': (30.3398, 76.3869),
+    'bathinda': (30.2110, 74.9455),
+    'karnal': (29.6857, 76.9905),
+    'hisar': (29.1492, 75.7217),
+    'belagavi': (15.8497, 74.4977),
+    'belgaum': (15.8497, 74.4977),
+    'hubli': (15.3647, 75.1240),
+    # States
+    'punjab': (30.9010, 75.8573),
+    'haryana': (29.0588, 76.0856),
+    'uttar pradesh': (26.8467, 80.9462),
+    'up': (26.8467, 80.9462),
+    'bihar': (25.0961, 85.3131),
+    'maharashtra': (19.7515, 75.7139),
+    'gujarat': (22.2587, 71.1924),
+    'rajasthan': (27.0238, 74.2179),
+    'karnataka': (15.3173, 75.7139),
+    'andhra pradesh': (15.9129, 79.7400),
+    'telangana': (18.1124, 79.0193),
+    'tamil nadu': (11.1271, 78.6569),
+    'kerala': (10.8505, 76.2711),
+    'west bengal': (22.9868, 87.8550),
+    'odisha': (20.9517, 85.0985),
+    'madhya pradesh': (22.9734, 78.6569),
+    'chhattisgarh': (21.2787, 81.8661),
+    'jharkhand': (23.6102, 85.2799),
+    'assam': (26.2006, 92.9376),
+    'uttarakhand': (30.0668, 79.0193),
+    'himachal pradesh': (31.1048, 77.1734),
+}
+
+# Open-Meteo WMO weather codes
+_WEATHER_BY_CODE: Dict[int, str] = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 
+    3: "Overcast", 45: "Fog", 48: "Depositing rime fog",
+    51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
+    61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
+    71: "Slight snow fall", 73: "Moderate snow fall", 75: "Heavy snow fall",
+    80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
+    95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
+}
+
+# Dense lookup for the 0-99 code range, indexed directly by code
+_WEATHER_CODE_LOOKUP: tuple = tuple(_WEATHER_BY_CODE.get(code, "Unknown") for code in range(100))
+
+NOMINATIM_SEARCH_URL = "https://nominatim.openstreetmap.org/search"
+OPEN_METEO_FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Fixed part of the Open-Meteo query; only latitude/longitude vary per call
+_FORECAST_PARAMS: Dict[str, str] = {
+    'current': 'temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m',
+    'hourly': 'temperature_2m,weather_code',
+    'daily': 'temperature_2m_max,temperature_2m_min,sunrise,sunset',
+    'temperature_unit': 'celsius',
+    'timezone': 'auto',
+}
+
+_SUN_TIME_FORMAT = '%I:%M %p'
+_HOUR_FORMAT = '%I%p'
+_DATE_FORMAT = '%A, %B %d'
+_MARKET_DATE_FORMAT = '%d-%b-%Y'
+
+def _forecast_window(times: List[str], current_hour: datetime, size: int) -> tuple:
+    """
+    Locate the forecast slots starting at the current hour.
+    
+    The (sorted) series is parsed once, vectorized with NumPy, and the current hour is found
+    by binary search.
+    
+    Returns:
+        Tuple of (start index, naive datetimes for up to ``size`` slots)
+    """
+    stripped = [t.removesuffix('Z') for t in times]
+    parsed = np.array(stripped, dtype='datetime64[s]')
+    start_index = int(np.searchsorted(parsed, np.datetime64(current_hour, 's')))
+    
+    if start_index == len(parsed):
+        start_index = 0
+    window = parsed[start_index:start_index + size]
+    return start_index, window.tolist()
+
+_today_cache: Dict[str, tuple] = {}  # format -> (day ordinal, formatted date)
+
+def _today_str(fmt: str) -> str:
+    """Format today's date, re-running strftime only when the day rolls over."""
+    today = date.today()
+    ordinal = today.toordinal()
+    cached = _today_cache.get(fmt)
+    if cached is None or cached[0] != ordinal:
+        cached = (ordinal, today.strftime(fmt))
+        _today_cache[fmt] = cached
+    return cached[1]
+
 class SharedAsyncClient:
-    """Singleton for aiohttp sessions with proper lifecycle management."""
-    _session = None
+    """Per-event-loop aiohttp sessions with proper lifecycle management."""
+    _sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
 
     @classmethod
     async def get_session(cls):
-        if cls._session is None or cls._session.closed:
-            cls._session = aiohttp.ClientSession(
+        # A session is bound to the loop that created it, so keep one per running loop
+        loop = asyncio.get_running_loop()
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            for stale_loop in [l for l in cls._sessions if l.is_closed()]:
+                del cls._sessions[stale_loop]
+            # Open-Meteo, Nominatim and Cloud Run are separate hosts: cap per host, not globally,
+            # and cache DNS so repeat calls skip the resolver. This stays on aiohttp/HTTP 1.1:
+            # identical concurrent lookups are already coalesced by InflightRequests, and the
+            # remaining parallel calls reuse keep-alive connections from this pool, so HTTP/2
+            # multiplexing (httpx + h2) would add a dependency for little gain at our fan-out.
+            connector = aiohttp.TCPConnector(
+                limit=0,
+                limit_per_host=32,
+                ttl_dns_cache=300,
+                keepalive_timeout=75
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
                 headers={'User-Agent': 'AI-Farm-Management-Assistant/1.0'},
-                timeout=aiohttp.ClientTimeout(total=30)
+                timeout=aiohttp.ClientTimeout(total=30, connect=3)
             )
-        return cls._session
+            cls._sessions[loop] = session
+        return session
     
     @classmethod
     async def close_session(cls):
-        """Close the shared session properly."""
-        if cls._session is not None and not cls._session.closed:
-            await cls._session.close()
-            cls._session = None
+        """Close the session of the running event loop."""
+        session = cls._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
             logger.info("Shared HTTP session closed successfully")
     
+    @classmethod
+    async def close_all(cls):
+        """Close the sessions of every event loop (sessions of already-closed loops are dropped)."""
+        current_loop = asyncio.get_running_loop()
+        for loop, session in list(cls._sessions.items()):
+            del cls._sessions[loop]
+            if session.closed or loop.is_closed():
+                continue
+            if loop is current_loop:
+                await session.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+        logger.info("All shared HTTP sessions closed")
+    
     @classmethod
     async def __aenter__(cls):
         """Async context manager entry."""
@@ -38,402 +242,519 @@ class SharedAsyncClient:
         """Async context manager exit with cleanup."""
         await cls.close_session()
 
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a fixed TTL (monotonic clock).
+    
+    Disk persistence is opt-in: when ``cache_dir`` is given, entries are also written to a
+    diskcache store at ``cache_dir/name`` so they survive process restarts. ``get``/``set``
+    only touch memory; use ``aget``/``aset`` to include the disk store, which is read and
+    written in a worker thread so the event loop never blocks on file I/O.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = config.cache_max_entries,
+                 name: str = "default", cache_dir: Optional[str] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()  # key -> (value, time.monotonic())
+        self._disk = None
+        if cache_dir:
+            try:
+                self._disk = diskcache.Cache(os.path.join(cache_dir, name), size_limit=50_000_000)
+            except Exception as e:
+                logger.warning(f"Disk cache '{name}' unavailable, using memory only: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        self._remember(key, value, time.monotonic())
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Like ``get``, falling back to the disk store on a memory miss."""
+        value = self.get(key)
+        if value is not None or self._disk is None:
+            return value
+        value, expire_time = await asyncio.to_thread(self._disk.get, key, None, expire_time=True)
+        if value is None or expire_time is None:
+            return None
+        # Promote into memory, keeping the entry's remaining lifetime
+        remaining = expire_time - time.time()
+        self._remember(key, value, time.monotonic() - (self.ttl - remaining))
+        return value
+
+    async def aset(self, key: str, value: Any) -> None:
+        """Like ``set``, also writing the entry to the disk store."""
+        self.set(key, value)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, expire=self.ttl)
+
+    def _remember(self, key: str, value: Any, stored_at: float) -> None:
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _revalidation_headers(validated: Optional[tuple]) -> Dict[str, str]:
+    """Build conditional request headers from a stored (etag, last_modified, data) entry."""
+    headers = {}
+    if validated:
+        etag, last_modified, _ = validated
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    return headers
+
+def _validated_entry(response: aiohttp.ClientResponse, data: Any) -> Optional[tuple]:
+    """Capture the response validators alongside its decoded body, if the server sent any."""
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        return (etag, last_modified, data)
+    return None
+
+def log_and_none_on_error(fn):
+    """Log any exception raised by an async processor method and return None instead."""
+    @functools.wraps(fn)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await fn(self, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error in {fn.__name__} for {', '.join(map(str, args))}: {e}")
+            return None
+    return wrapper
+
+class InflightRequests:
+    """Coalesces concurrent fetches for the same key into one shared task (single-flight)."""
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, fetch):
+        """Await ``fetch()`` for ``key``, joining an identical fetch if one is already running."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(key, None) if self._tasks.get(key) is done else None)
+        # Shield so one cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+@dataclass(slots=True, frozen=True)
+class CommodityRecord:
+    """Market sampling data for one commodity, with per-market states resolved up front."""
+    name: str
+    markets: tuple
+    states: tuple
+    price_min: int
+    price_max: int
+    price_modal: int
+
+def _build_commodity_table(commodity_mapping: Dict[str, str], sample_data: Dict[str, Dict[str, Any]],
+                           state_mapping: Dict[str, str]) -> Dict[str, CommodityRecord]:
+    """Merge crop aliases, sample market data and market states into one lookup table."""
+    table = {}
+    for crop_key, commodity in commodity_mapping.items():
+        data = sample_data.get(commodity)
+        if data is None:
+            continue
+        price_min, price_max = data['price_range']
+        markets = tuple(data['markets'])
+        table[crop_key] = CommodityRecord(
+            name=commodity,
+            markets=markets,
+            states=tuple(state_mapping.get(market, market) for market in markets),
+            price_min=price_min,
+            price_max=price_max,
+            price_modal=int((price_min + price_max) / 2)
+        )
+    return table
+
 class MarketPriceProcessor:
     """Market price processor using Agmarknet/data.gov.in for Indian mandi prices."""
     
+    commodity_mapping = {
+        'rice': 'Rice',
+        'paddy': 'Paddy(Dhan)(Common)',
+        'wheat': 'Wheat',
+        'corn': 'Maize',
+        'maize': 'Maize',
+        'cotton': 'Cotton',
+        'soybean': 'Soyabean',
+        'soya': 'Soyabean',
+        'groundnut': 'Groundnut',
+        'peanut': 'Groundnut',
+        'mustard': 'Mustard',
+        'rapeseed': 'Rapeseed',
+        'chickpea': 'Gram(Whole)',
+        'chana': 'Gram(Whole)',
+        'gram': 'Gram(Whole)',
+        'tur': 'Arhar (Tur/Red Gram)(Whole)',
+        'arhar': 'Arhar (Tur/Red Gram)(Whole)',
+        'pigeon pea': 'Arhar (Tur/Red Gram)(Whole)',
+        'moong': 'Moong(Green Gram)',
+        'green gram': 'Moong(Green Gram)',
+        'urad': 'Black Gram',
+        'black gram': 'Black Gram',
+        'sugarcane': 'Sugarcane',
+        'potato': 'Potato',
+        'onion': 'Onion',
+        'tomato': 'Tomato',
+        'bajra': 'Bajra(Pearl Millet/Cumbu)',
+        'pearl millet': 'Bajra(Pearl Millet/Cumbu)',
+        'jowar': 'Jowar(Sorghum)',
+        'sorghum': 'Jowar(Sorghum)',
+    }
+    
+    sample_data = {
+        'Rice': {'markets': ['Delhi', 'Mumbai', 'Bangalore', 'Chennai'], 'price_range': (2000, 3500)},
+        'Wheat': {'markets': ['Delhi', 'Punjab', 'Haryana', 'UP'], 'price_range': (2200, 2800)},
+        'Paddy(Dhan)(Common)': {'markets': ['Punjab', 'Haryana', 'UP', 'West Bengal'], 'price_range': (1800, 2400)},
+        'Maize': {'markets': ['Karnataka', 'Maharashtra', 'Bihar', 'UP'], 'price_range': (1600, 2200)},
+        'Cotton': {'markets': ['Gujarat', 'Maharashtra', 'Telangana', 'Punjab'], 'price_range': (5500, 7500)},
+        'Soyabean': {'markets': ['Madhya Pradesh', 'Maharashtra', 'Rajasthan'], 'price_range': (3800, 4500)},
+        'Groundnut': {'markets': ['Gujarat', 'Rajasthan', 'Tamil Nadu'], 'price_range': (5000, 6500)},
+        'Gram(Whole)': {'markets': ['Madhya Pradesh', 'Maharashtra', 'Rajasthan'], 'price_range': (4500, 5500)},
+        'Arhar (Tur/Red Gram)(Whole)': {'markets': ['Maharashtra', 'Karnataka', 'Madhya Pradesh'], 'price_range': (6000, 7500)},
+        'Moong(Green Gram)': {'markets': ['Rajasthan', 'Maharashtra', 'Karnataka'], 'price_range': (6500, 8000)},
+        'Sugarcane': {'markets': ['Uttar Pradesh', 'Maharashtra', 'Karnataka'], 'price_range': (280, 350)},
+        'Potato': {'markets': ['Uttar Pradesh', 'West Bengal', 'Bihar'], 'price_range': (800, 1500)},
+        'Onion': {'markets': ['Maharashtra', 'Karnataka', 'Gujarat'], 'price_range': (1200, 2500)},
+        'Tomato': {'markets': ['Karnataka', 'Andhra Pradesh', 'Maharashtra'], 'price_range': (1000, 2000)},
+    }
+    
+    state_mapping = {
+        'Delhi': 'Delhi',
+        'Mumbai': 'Maharashtra',
+        'Bangalore': 'Karnataka',
+        'Chennai': 'Tamil Nadu',
+        'Punjab': 'Punjab',
+        'Haryana': 'Haryana',
+        'UP': 'Uttar Pradesh',
+        'West Bengal': 'West Bengal',
+        'Karnataka': 'Karnataka',
+        'Maharashtra': 'Maharashtra',
+        'Bihar': 'Bihar',
+        'Gujarat': 'Gujarat',
+        'Telangana': 'Telangana',
+        'Madhya Pradesh': 'Madhya Pradesh',
+        'Rajasthan': 'Rajasthan',
+        'Tamil Nadu': 'Tamil Nadu',
+        'Andhra Pradesh': 'Andhra Pradesh',
+        'Uttar Pradesh': 'Uttar Pradesh',
+    }
+    
+    # crop alias -> merged record, built once at class definition
+    _TABLE = _build_commodity_table(commodity_mapping, sample_data, state_mapping)
+    
     def __init__(self):
-        self.cache: Dict[str, tuple[MarketPriceData, datetime]] = {}
         self.cache_duration = config.cache_duration_market
-        
-        self.commodity_mapping = {
-            'rice': 'Rice',
-            'paddy': 'Paddy(Dhan)(Common)',
-            'wheat': 'Wheat',
-            'corn': 'Maize',
-            'maize': 'Maize',
-            'cotton': 'Cotton',
-            'soybean': 'Soyabean',
-            'soya': 'Soyabean',
-            'groundnut': 'Groundnut',
-            'peanut': 'Groundnut',
-            'mustard': 'Mustard',
-            'rapeseed': 'Rapeseed',
-            'chickpea': 'Gram(Whole)',
-            'chana': 'Gram(Whole)',
-            'gram': 'Gram(Whole)',
-            'tur': 'Arhar (Tur/Red Gram)(Whole)',
-            'arhar': 'Arhar (Tur/Red Gram)(Whole)',
-            'pigeon pea': 'Arhar (Tur/Red Gram)(Whole)',
-            'moong': 'Moong(Green Gram)',
-            'green gram': 'Moong(Green Gram)',
-            'urad': 'Black Gram',
-            'black gram': 'Black Gram',
-            'sugarcane': 'Sugarcane',
-            'potato': 'Potato',
-            'onion': 'Onion',
-            'tomato': 'Tomato',
-            'bajra': 'Bajra(Pearl Millet/Cumbu)',
-            'pearl millet': 'Bajra(Pearl Millet/Cumbu)',
-            'jowar': 'Jowar(Sorghum)',
-            'sorghum': 'Jowar(Sorghum)',
-        }
-        
-        self.sample_data = {
-            'Rice': {'markets': ['Delhi', 'Mumbai', 'Bangalore', 'Chennai'], 'price_range': (2000, 3500)},
-            'Wheat': {'markets': ['Delhi', 'Punjab', 'Haryana', 'UP'], 'price_range': (2200, 2800)},
-            'Paddy(Dhan)(Common)': {'markets': ['Punjab', 'Haryana', 'UP', 'West Bengal'], 'price_range': (1800, 2400)},
-            'Maize': {'markets': ['Karnataka', 'Maharashtra', 'Bihar', 'UP'], 'price_range': (1600, 2200)},
-            'Cotton': {'markets': ['Gujarat', 'Maharashtra', 'Telangana', 'Punjab'], 'price_range': (5500, 7500)},
-            'Soyabean': {'markets': ['Madhya Pradesh', 'Maharashtra', 'Rajasthan'], 'price_range': (3800, 4500)},
-            'Groundnut': {'markets': ['Gujarat', 'Rajasthan', 'Tamil Nadu'], 'price_range': (5000, 6500)},
-            'Gram(Whole)': {'markets': ['Madhya Pradesh', 'Maharashtra', 'Rajasthan'], 'price_range': (4500, 5500)},
-            'Arhar (Tur/Red Gram)(Whole)': {'markets': ['Maharashtra', 'Karnataka', 'Madhya Pradesh'], 'price_range': (6000, 7500)},
-            'Moong(Green Gram)': {'markets': ['Rajasthan', 'Maharashtra', 'Karnataka'], 'price_range': (6500, 8000)},
-            'Sugarcane': {'markets': ['Uttar Pradesh', 'Maharashtra', 'Karnataka'], 'price_range': (280, 350)},
-            'Potato': {'markets': ['Uttar Pradesh', 'West Bengal', 'Bihar'], 'price_range': (800, 1500)},
-            'Onion': {'markets': ['Maharashtra', 'Karnataka', 'Gujarat'], 'price_range': (1200, 2500)},
-            'Tomato': {'markets': ['Karnataka', 'Andhra Pradesh', 'Maharashtra'], 'price_range': (1000, 2000)},
-        }
+        self.cache = TTLCache(self.cache_duration, name="market", cache_dir=config.cache_dir)
+        self._rng = random.Random()  # private generator, not shared with the module-level random state
 
     @observe_if_available(name="get_market_price")
+    @log_and_none_on_error
     async def get_market_price(self, crop_name: str) -> Optional[MarketPriceData]:
         """Get market price for a given crop from Indian mandis."""
-        try:
-            crop_key = crop_name.lower().strip()
-            cache_key = crop_key
-            current_time = datetime.now()
-            
-            if cache_key in self.cache:
-                cached_data, cache_time = self.cache[cache_key]
-                if (current_time - cache_time).seconds < self.cache_duration:
-                    logger.debug(f"Using cached market price data for {crop_name}")
-                    return cached_data
-
-            commodity = self.commodity_mapping.get(crop_key)
-            
-            if not commodity:
-                logger.warning(f"Commodity {crop_name} not found in mapping")
-                return None
-            
-            if commodity not in self.sample_data:
-                logger.warning(f"No market data available for {commodity}")
-                return None
-            
-            data = self.sample_data[commodity]
-            markets = data['markets']
-            price_range = data['price_range']
-            
-            price_min = price_range[0]
-            price_max = price_range[1]
-            price_modal = int((price_min + price_max) / 2)
-            
-            price_min = int(price_min + random.randint(-100, 50))
-            price_max = int(price_max + random.randint(-50, 100))
-            
-            market = random.choice(markets)
-            
-            state_mapping = {
-                'Delhi': 'Delhi',
-                'Mumbai': 'Maharashtra',
-                'Bangalore': 'Karnataka',
-                'Chennai': 'Tamil Nadu',
-                'Punjab': 'Punjab',
-                'Haryana': 'Haryana',
-                'UP': 'Uttar Pradesh',
-                'West Bengal': 'West Bengal',
-                'Karnataka': 'Karnataka',
-                'Maharashtra': 'Maharashtra',
-                'Bihar': 'Bihar',
-                'Gujarat': 'Gujarat',
-                'Telangana': 'Telangana',
-                'Madhya Pradesh': 'Madhya Pradesh',
-                'Rajasthan': 'Rajasthan',
-                'Tamil Nadu': 'Tamil Nadu',
-                'Andhra Pradesh': 'Andhra Pradesh',
-                'Uttar Pradesh': 'Uttar Pradesh',
-            }
-            
-            state = state_mapping.get(market, market)
-            
-            price_data = MarketPriceData(
-                commodity=commodity,
-                market=f"{market} Mandi",
-                state=state,
-                price_min=price_min,
-                price_max=price_max,
-                price_modal=price_modal,
-                unit="₹/Quintal",
-                date=datetime.now().strftime('%d-%b-%Y'),
-                arrival="Good" if random.random() > 0.5 else "Moderate"
-            )
-            
-            self.cache[cache_key] = (price_data, current_time)
-            
-            logger.info(f"Fetched market price for {commodity}: ₹{price_modal}/quintal at {market}")
-            return price_data
+        crop_key = crop_name.lower().strip()
+        cache_key = crop_key
+        
+        cached_data = await self.cache.aget(cache_key)
+        if cached_data is not None:
+            logger.debug("Using cached market price data for %s", crop_name)
+            return cached_data
 
-        except Exception as e:
-            logger.error(f"Market price error for {crop_name}: {e}")
+        record = self._TABLE.get(crop_key)
+        
+        if not record:
+            logger.warning(f"No market data available for {crop_name}")
             return None
+        
+        commodity = record.name
+        price_modal = record.price_modal
+        rand = self._rng.random
+        price_min = record.price_min - 100 + int(rand() * 151)   # jitter in [-100, 50]
+        price_max = record.price_max - 50 + int(rand() * 151)    # jitter in [-50, 100]
+        
+        idx = int(rand() * len(record.markets))
+        market = record.markets[idx]
+        state = record.states[idx]
+        
+        price_data = MarketPriceData(
+            commodity=commodity,
+            market=f"{market} Mandi",
+            state=state,
+            price_min=price_min,
+            price_max=price_max,
+            price_modal=price_modal,
+            unit="₹/Quintal",
+            date=_today_str(_MARKET_DATE_FORMAT),
+            arrival="Good" if rand() > 0.5 else "Moderate"
+        )
+        
+        await self.cache.aset(cache_key, price_data)
+        
+        logger.info(f"Fetched market price for {commodity}: ₹{price_modal}/quintal at {market}")
+        return price_data
 
 class WeatherDataProcessor:
     """Weather data processor using Open-Meteo API for real-time weather information."""
     
     def __init__(self):
-        self.cache: Dict[str, tuple[WeatherData, datetime]] = {}
-        self.geocoding_cache: Dict[str, tuple] = {}
         self.cache_duration = config.cache_duration_weather
+        self.cache = TTLCache(self.cache_duration)
+        self.validated = TTLCache(config.cache_duration_revalidation)  # raw responses kept for If-None-Match
+        self.geocoding_cache = TTLCache(config.cache_duration_geocoding, name="geocoding", cache_dir=config.cache_dir)
+        self._inflight_weather = InflightRequests()
+        self._inflight_geocoding = InflightRequests()
 
+    @log_and_none_on_error
     async def get_coordinates(self, location: str) -> Optional[tuple]:
         """Get latitude and longitude for a given location using geocoding."""
-        try:
-            if location.lower() in self.geocoding_cache:
-                return self.geocoding_cache[location.lower()]
-            
-            common_cities = {
-                'delhi': (28.7041, 77.1025),
-                'mumbai': (19.0760, 72.8777),
-                'bangalore': (12.9716, 77.5946),
-                'bengaluru': (12.9716, 77.5946),
-                'chennai': (13.0827, 80.2707),
-                'kolkata': (22.5726, 88.3639),
-                'hyderabad': (17.3850, 78.4867),
-                'pune': (18.5204, 73.8567),
-                'ahmedabad': (23.0225, 72.5714),
-                'jaipur': (26.9124, 75.7873),
-                'punjab': (30.9010, 75.8573),
-            }
-            
-            location_key = location.lower().strip()
-            if location_key in common_cities:
-                coords = common_cities[location_key]
-                self.geocoding_cache[location_key] = coords
-                logger.info(f"Found coordinates for {location}: {coords}")
-                return coords
-            
-            session = await SharedAsyncClient.get_session()
-            headers = {'User-Agent': 'AI-Farm-Management-Assistant/1.0'}
-            url = f"https://nominatim.openstreetmap.org/search?q={location}&format=json&limit=1"
-            
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data and len(data) > 0:
-                        lat = float(data[0]['lat'])
-                        lon = float(data[0]['lon'])
-                        coords = (lat, lon)
-                        self.geocoding_cache[location_key] = coords
-                        logger.info(f"Geocoded {location} to: {coords}")
-                        return coords
-            
-            logger.error(f"Could not geocode location: {location}")
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error geocoding location {location}: {e}")
-            return None
+        location_key = location.lower().strip()
+        cached_coords = await self.geocoding_cache.aget(location_key)
+        if cached_coords is not None:
+            return cached_coords
+        
+        # "Ludhiana, Punjab, India" -> try the full string, then the leading place name
+        coords = (INDIAN_LOCATION_COORDINATES.get(location_key)
+                  or INDIAN_LOCATION_COORDINATES.get(location_key.split(',', 1)[0].strip()))
+        if coords:
+            await self.geocoding_cache.aset(location_key, coords)
+            logger.info(f"Found coordinates for {location}: {coords}")
+            return coords
+        
+        return await self._inflight_geocoding.run(location_key, lambda: self._geocode(location, location_key))
+
+    async def _geocode(self, location: str, location_key: str) -> Optional[tuple]:
+        """Look up coordinates via Nominatim and cache them."""
+        session = await SharedAsyncClient.get_session()
+        headers = {'User-Agent': 'AI-Farm-Management-Assistant/1.0'}
+        params = {'q': location, 'format': 'json', 'limit': '1'}
+        
+        async with session.get(NOMINATIM_SEARCH_URL, params=params, headers=headers) as response:
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                if data and len(data) > 0:
+                    lat = float(data[0]['lat'])
+                    lon = float(data[0]['lon'])
+                    coords = (lat, lon)
+                    await self.geocoding_cache.aset(location_key, coords)
+                    logger.info(f"Geocoded {location} to: {coords}")
+                    return coords
+        
+        logger.error(f"Could not geocode location: {location}")
+        return None
 
     def get_weather_condition(self, weather_code: int) -> str:
         """Convert weather code to human-readable condition."""
-        weather_codes = {
-            0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 
-            3: "Overcast", 45: "Fog", 48: "Depositing rime fog",
-            51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
-            61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
-            71: "Slight snow fall", 73: "Moderate snow fall", 75: "Heavy snow fall",
-            80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
-            95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
-        }
-        return weather_codes.get(weather_code, "Unknown")
+        if isinstance(weather_code, int) and 0 <= weather_code < len(_WEATHER_CODE_LOOKUP):
+            return _WEATHER_CODE_LOOKUP[weather_code]
+        return _WEATHER_BY_CODE.get(weather_code, "Unknown")
 
     @observe_if_available(name="get_weather_data")
+    @log_and_none_on_error
     async def get_weather_data(self, location: str) -> Optional[WeatherData]:
         """Get weather data for a given location."""
-        try:
-            logger.info(f"Fetching weather data for location: {location}")
-            cache_key = location.lower()
-            current_time = datetime.now()
-            
-            if cache_key in self.cache:
-                cached_data, cache_time = self.cache[cache_key]
-                if (current_time - cache_time).seconds < self.cache_duration:
-                    logger.debug(f"Using cached weather data for {location}")
-                    return cached_data
-
-            coords = await self.get_coordinates(location)
-            if not coords:
+        logger.info(f"Fetching weather data for location: {location}")
+        cache_key = location.lower()
+        
+        cached_data = self.cache.get(cache_key)
+        if cached_data is not None:
+            logger.debug("Using cached weather data for %s", location)
+            return cached_data
+
+        return await self._inflight_weather.run(cache_key, lambda: self._fetch_weather_data(location, cache_key))
+
+    async def _fetch_weather_data(self, location: str, cache_key: str) -> Optional[WeatherData]:
+        """Fetch current conditions and forecast from Open-Meteo and cache the result."""
+        coords = await self.get_coordinates(location)
+        if not coords:
+            return None
+        
+        latitude, longitude = coords
+        
+        params = {'latitude': str(latitude), 'longitude': str(longitude), **_FORECAST_PARAMS}
+
+        validated = self.validated.get(cache_key)
+        session = await SharedAsyncClient.get_session()
+        async with session.get(OPEN_METEO_FORECAST_URL, params=params, headers=_revalidation_headers(validated)) as response:
+            if response.status == 304 and validated:
+                logger.debug("Weather data for %s not modified, reusing last response", location)
+                data = validated[2]
+            elif response.status != 200:
+                logger.error(f"Weather API returned status {response.status}")
                 return None
-            
-            latitude, longitude = coords
-            
-            url = (
-                f"https://api.open-meteo.com/v1/forecast?"
-                f"latitude={latitude}&longitude={longitude}"
-                f"&current=temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m"
-                f"&hourly=temperature_2m,weather_code"
-                f"&daily=temperature_2m_max,temperature_2m_min,sunrise,sunset"
-                f"&temperature_unit=celsius&timezone=auto"
-            )
+            else:
+                data = await response.json(loads=orjson.loads)
+                entry = _validated_entry(response, data)
+                if entry:
+                    self.validated.set(cache_key, entry)
+
+        current = data.get('current', {})
+        daily = data.get('daily', {})
+        hourly = data.get('hourly', {})
 
-            session = await SharedAsyncClient.get_session()
-            async with session.get(url) as response:
-                if response.status != 200:
-                    logger.error(f"Weather API returned status {response.status}")
-                    return None
-                data = await response.json()
-
-            current = data.get('current', {})
-            daily = data.get('daily', {})
-            hourly = data.get('hourly', {})
-
-            current_temp = current.get('temperature_2m')
-            weather_code = current.get('weather_code', 0)
-            condition = self.get_weather_condition(weather_code)
-            humidity = current.get('relative_humidity_2m')
-            wind_speed = current.get('wind_speed_10m')
-
-            daily_max = daily.get('temperature_2m_max', [None])[0] if daily.get('temperature_2m_max') else None
-            daily_min = daily.get('temperature_2m_min', [None])[0] if daily.get('temperature_2m_min') else None
+        current_temp = current.get('temperature_2m')
+        weather_code = current.get('weather_code', 0)
+        condition = self.get_weather_condition(weather_code)
+        humidity = current.get('relative_humidity_2m')
+        wind_speed = current.get('wind_speed_10m')
+
+        daily_max = daily.get('temperature_2m_max', [None])[0] if daily.get('temperature_2m_max') else None
+        daily_min = daily.get('temperature_2m_min', [None])[0] if daily.get('temperature_2m_min') else None
+        
+        sunrise = daily.get('sunrise', [None])[0] if daily.get('sunrise') else None
+        sunset = daily.get('sunset', [None])[0] if daily.get('sunset') else None
+        
+        if sunrise:
+            sunrise_dt = datetime.fromisoformat(sunrise.replace('Z', '+00:00'))
+            sunrise = sunrise_dt.strftime(_SUN_TIME_FORMAT)
+        if sunset:
+            sunset_dt = datetime.fromisoformat(sunset.replace('Z', '+00:00'))
+            sunset = sunset_dt.strftime(_SUN_TIME_FORMAT)
+
+        hourly_forecast = []
+        if hourly.get('time') and hourly.get('temperature_2m') and hourly.get('weather_code'):
+            current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
             
-            sunrise = daily.get('sunrise', [None])[0] if daily.get('sunrise') else None
-            sunset = daily.get('sunset', [None])[0] if daily.get('sunset') else None
+            try:
+                start_index, hour_times = _forecast_window(hourly['time'], current_hour, 7)
+            except ValueError as e:
+                logger.debug("Error parsing hourly times: %s", e)
+                start_index, hour_times = 0, []
             
-            if sunrise:
-                sunrise_dt = datetime.fromisoformat(sunrise.replace('Z', '+00:00'))
-                sunrise = sunrise_dt.strftime('%I:%M %p')
-            if sunset:
-                sunset_dt = datetime.fromisoformat(sunset.replace('Z', '+00:00'))
-                sunset = sunset_dt.strftime('%I:%M %p')
-
-            hourly_forecast = []
-            if hourly.get('time') and hourly.get('temperature_2m') and hourly.get('weather_code'):
-                current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
-                start_index = 0
-                
-                for i, time_str in enumerate(hourly['time']):
-                    try:
-                        if time_str.endswith('Z'):
-                            hour_time = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-                        else:
-                            hour_time = datetime.fromisoformat(time_str)
-                        
-                        if hour_time.tzinfo is not None:
-                            hour_time = hour_time.replace(tzinfo=None)
-                        
-                        if hour_time >= current_hour:
-                            start_index = i
-                            break
-                    except Exception as e:
-                        logger.debug(f"Error parsing time {time_str}: {e}")
-                        continue
-                
-                for i in range(start_index, min(start_index + 7, len(hourly['time']))):
-                    try:
-                        time_str = hourly['time'][i]
-                        if time_str.endswith('Z'):
-                            hour_time = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-                        else:
-                            hour_time = datetime.fromisoformat(time_str)
-                        
-                        if hour_time.tzinfo is not None:
-                            hour_time = hour_time.replace(tzinfo=None)
-                        
-                        hour_condition = self.get_weather_condition(hourly['weather_code'][i])
-                        temp = round(hourly['temperature_2m'][i])
-                        formatted_time = hour_time.strftime('%I%p').lower().lstrip('0').replace('m', '')
-                        
-                        hourly_forecast.append(HourlyWeatherData(
-                            time=formatted_time,
-                            temperature=temp,
-                            condition=hour_condition
-                        ))
-                    except Exception as e:
-                        logger.error(f"Error processing hourly data: {e}")
-                        continue
-
-            weather_data = WeatherData(
-                location=location.title(),
-                date=datetime.now().strftime('%A, %B %d'),
-                current_temperature=round(current_temp) if current_temp else 0,
-                condition=condition,
-                high_temperature=round(daily_max) if daily_max else 0,
-                low_temperature=round(daily_min) if daily_min else 0,
-                humidity=round(humidity) if humidity else None,
-                wind_speed=round(wind_speed) if wind_speed else None,
-                sunrise=sunrise,
-                sunset=sunset,
-                hourly_forecast=hourly_forecast,
-                temperature_unit="°C",
-                wind_unit="km/h"
-            )
+            for i, hour_time in enumerate(hour_times, start_index):
+                try:
+                    hour_condition = self.get_weather_condition(hourly['weather_code'][i])
+                    temp = round(hourly['temperature_2m'][i])
+                    formatted_time = hour_time.strftime(_HOUR_FORMAT).lower().lstrip('0').replace('m', '')
+                    
+                    hourly_forecast.append(HourlyWeatherData(
+                        time=formatted_time,
+                        temperature=temp,
+                        condition=hour_condition
+                    ))
+                except Exception as e:
+                    logger.error(f"Error processing hourly data: {e}")
+                    continue
 
-            self.cache[cache_key] = (weather_data, current_time)
-            logger.info(f"Fetched weather for {location}: {current_temp}°C, {condition}")
-            return weather_data
+        weather_data = WeatherData(
+            location=location.title(),
+            date=_today_str(_DATE_FORMAT),
+            current_temperature=round(current_temp) if current_temp else 0,
+            condition=condition,
+            high_temperature=round(daily_max) if daily_max else 0,
+            low_temperature=round(daily_min) if daily_min else 0,
+            humidity=round(humidity) if humidity else None,
+            wind_speed=round(wind_speed) if wind_speed else None,
+            sunrise=sunrise,
+            sunset=sunset,
+            hourly_forecast=hourly_forecast,
+            temperature_unit="°C",
+            wind_unit="km/h"
+        )
 
-        except Exception as e:
-            logger.error(f"Error fetching weather data for {location}: {e}")
-            return None
+        self.cache.set(cache_key, weather_data)
+        logger.info(f"Fetched weather for {location}: {current_temp}°C, {condition}")
+        return weather_data
 
 class SheetDataProcessor:
     """Sheet data processor that calls the deployed Cloud Run function."""
     
     def __init__(self):
         self.base_url = config.base_url_sheets
-        self.cache: Dict[str, tuple[Dict[str, Any], datetime]] = {}
         self.cache_duration = config.cache_duration_sheets
+        self.cache = TTLCache(self.cache_duration)
+        self.validated = TTLCache(config.cache_duration_revalidation)  # raw responses kept for If-None-Match
+        self._inflight = InflightRequests()
     
     @observe_if_available(name="get_customer_data")
+    @log_and_none_on_error
     async def get_customer_data(self, customer_id: str) -> Optional[Dict[str, Any]]:
         """Get customer data from Google Sheets via Cloud Run function."""
-        try:
-            # Check cache first
-            cache_key = f"customer_{customer_id}"
-            current_time = datetime.now()
-            
-            if cache_key in self.cache:
-                cached_data, cache_time = self.cache[cache_key]
-                if (current_time - cache_time).seconds < self.cache_duration:
-                    logger.debug(f"Using cached data for customer {customer_id}")
-                    return cached_data
-            
-            # Make API call to Cloud Run function
-            session = await SharedAsyncClient.get_session()
-            params = {"customer_id": customer_id}
-            headers = {"Content-Type": "application/json"}
-            
-            async with session.get(
-                self.base_url, 
-                params=params, 
-                headers=headers
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    # Cache the result
-                    self.cache[cache_key] = (data, current_time)
-                    logger.info(f"Fetched customer data for ID: {customer_id}")
-                    return data
-                elif response.status == 404:
-                    logger.warning(f"Customer ID {customer_id} not found")
-                    return None
-                else:
-                    error_text = await response.text()
-                    logger.error(f"API returned {response.status}: {error_text}")
-                    return None
-                        
-        except Exception as e:
-            logger.error(f"Error fetching customer data for {customer_id}: {e}")
-            return None
+        # Check cache first
+        cache_key = f"customer_{customer_id}"
+        
+        cached_data = self.cache.get(cache_key)
+        if cached_data is not None:
+            logger.debug("Using cached data for customer %s", customer_id)
+            return cached_data
+        
+        return await self._inflight.run(cache_key, lambda: self._fetch_customer_data(customer_id, cache_key))
+
+    async def _fetch_customer_data(self, customer_id: str, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Call the Cloud Run function and cache a successful response."""
+        # Make API call to Cloud Run function
+        session = await SharedAsyncClient.get_session()
+        params = {"customer_id": customer_id}
+        validated = self.validated.get(cache_key)
+        headers = {"Content-Type": "application/json", **_revalidation_headers(validated)}
+        
+        async with session.get(
+            self.base_url, 
+            params=params, 
+            headers=headers
+        ) as response:
+            if response.status == 304 and validated:
+                logger.debug("Customer data for ID %s not modified, reusing last response", customer_id)
+                self.cache.set(cache_key, validated[2])
+                return validated[2]
+            elif response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                # Cache the result
+                self.cache.set(cache_key, data)
+                entry = _validated_entry(response, data)
+                if entry:
+                    self.validated.set(cache_key, entry)
+                logger.info(f"Fetched customer data for ID: {customer_id}")
+                return data
+            elif response.status == 404:
+                logger.warning(f"Customer ID {customer_id} not found")
+                return None
+            else:
+                error_text = await response.text()
+                logger.error(f"API returned {response.status}: {error_text}")
+                return None
 
 # Global instances
 weather_processor = WeatherDataProcessor()  
 market_price_processor = MarketPriceProcessor()
 sheet_processor = SheetDataProcessor()
 
+async def fetch_all_context(location: str, crop: str, customer_id: str) -> tuple:
+    """
+    Fetch weather, market price and customer data concurrently.
+    
+    Returns:
+        Tuple of (weather_data, market_price_data, customer_data). A failed lookup
+        yields None or the raised exception in its slot instead of failing the batch.
+    """
+    return tuple(await asyncio.gather(
+        weather_processor.get_weather_data(location),
+        market_price_processor.get_market_price(crop),
+        sheet_processor.get_customer_data(customer_id),
+        return_exceptions=True
+    ))
+
 async def cleanup_all_processors():
     """Clean up all processor resources and HTTP sessions."""
     try:
-        await SharedAsyncClient.close_session()
+        await SharedAsyncClient.close_all()
         logger.info("All processor resources cleaned up successfully")
     except Exception as e:
         logger.error(f"Error during processor cleanup: {e}")
@@ -444,17 +765,14 @@ import asyncio
 
 def sync_cleanup():
     """Synchronous cleanup function for atexit."""
-    try:
-        # Try to run async cleanup if possible
+    # Each session must be closed on its own loop; loops that are closed or still running are skipped
+    for loop, session in list(SharedAsyncClient._sessions.items()):
         try:
-            loop = asyncio.get_event_loop()
-            if not loop.is_closed():
-                loop.run_until_complete(SharedAsyncClient.close_session())
-        except RuntimeError:
-            # Create new event loop if needed
-            asyncio.run(SharedAsyncClient.close_session())
-    except Exception as e:
-        print(f"Warning: Failed to cleanup sessions on exit: {e}")
+            if not session.closed and not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(session.close())
+        except Exception as e:
+            print(f"Warning: Failed to cleanup sessions on exit: {e}")
+    SharedAsyncClient._sessions.clear()
 
 # Register cleanup function
 atexit.register(sync_cleanup)
\ No newline at end of file
@@ -6,13 +6,15 @@ Contains all data models and processor classes for weather, market prices, and s
 
 import aiohttp
 from loguru import logger
+from dataclasses import dataclass
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
-class HourlyWeatherData(BaseModel):
-    """Hourly weather forecast data model."""
+@dataclass(slots=True, frozen=True)
+class HourlyWeatherData:
+    """Hourly weather forecast data model (slotted; one instance per forecast hour)."""
     time: str
     temperature: float
     condition: str
@@ -45,4 +47,21 @@ class MarketPriceData(BaseModel):
     price_modal: float
     unit: str
     date: str
-    arrival: Optional[str] = None
\ No newline at end of file
+    arrival: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
+class FarmerContext:
+    """Farmer details from the ADK session state, shared by the planning tools (hashable)."""
+    location: str = ""
+    crop_type: tuple = ()
+    farm_size: str = ""
+    experience: str = "intermediate"
+
+    def as_context(self, include_farm_size: bool = True) -> Dict[str, Any]:
+        """Planner context dict; crop_type stays a list as the planning prompts expect."""
+        context = {"location": self.location, "crop_type": list(self.crop_type)}
+        if include_farm_size:
+            context["farm_size"] = self.farm_size
+        context["experience"] = self.experience
+        return context
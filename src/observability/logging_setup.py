@@ -1,27 +1,94 @@
+import atexit
 import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 from loguru import logger as loguru_logger
 import os
 
+_CONFIGURED = False
+_CONFIG_LOCK = threading.Lock()
+_LISTENERS: list = []  # running QueueListeners, stopped at exit
+
+class _CachedFormatter(logging.Formatter):
+    """Formatter that renders the asctime seconds once per second instead of once per record."""
+    _cached = (None, "")  # (whole second, formatted time); swapped as one tuple, so listener threads can share it
+    
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, text = self._cached
+        if cached_second != second:
+            text = time.strftime(self.default_time_format, self.converter(second))
+            self._cached = (second, text)
+        return self.default_msec_format % (text, record.msecs)
+
+class _BufferedFileHandler(logging.FileHandler):
+    """FileHandler with a 64 KiB write buffer that leaves flushing to its queue listener."""
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=65536, encoding=self.encoding, errors=self.errors)
+    
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+class _BatchingQueueListener(QueueListener):
+    """Flush handlers only once the queue runs dry, so a burst of records shares one write()."""
+    
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+def _queue_handler(*handlers: logging.Handler) -> QueueHandler:
+    """Front the given handlers with a queue drained by a background listener thread."""
+    log_queue = queue.Queue(-1)
+    listener = _BatchingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # flush queued records on shutdown
+    _LISTENERS.append(listener)
+    return QueueHandler(log_queue)
+
 def setup_logging(debug_mode: bool = True):
     """Hierarchical logging setup (file + console, no duplication)."""
+    global _CONFIGURED
+    # Configure exactly once, even when several threads race to set up logging
+    with _CONFIG_LOCK:
+        if _CONFIGURED:
+            return
+        _configure_logging(debug_mode)
+        _CONFIGURED = True
     
-    # Check if already configured to prevent duplicate setup
-    if hasattr(setup_logging, '_configured'):
-        return
-    
-    # Root config (file-only to avoid terminal duplication)
-    logging.basicConfig(
-        level=logging.DEBUG if debug_mode else logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-        handlers=[
-            logging.FileHandler('farm_agent.log', encoding='utf-8')  # Only file logging to avoid duplication
-        ]
-    )
+    # Log setup completion
+    logging.getLogger('farm_agent').info(f"Logging setup complete (debug_mode={debug_mode})")
+
+def _configure_logging(debug_mode: bool):
+    """Attach the queue-backed handlers and the loguru sink (called once by setup_logging)."""
+    # One formatter instance shared by the file and console handlers
+    formatter = _CachedFormatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
     
-    # Console handler for detailed debugging
+    # Root config (file-only to avoid terminal duplication); writes happen on the listener thread
+    file_handler = _BufferedFileHandler('farm_agent.log', encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
+    root_logger.addHandler(_queue_handler(file_handler))
+    
+    # Console handler for detailed debugging, also behind a queue so callers never block on stderr
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.DEBUG if debug_mode else logging.INFO)
-    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+    console_handler.setFormatter(formatter)
+    console_queue_handler = _queue_handler(console_handler)
     
     # Custom loggers with console output (hierarchical, propagate=False to avoid duplication)
     loggers = [
@@ -35,29 +102,35 @@ def setup_logging(debug_mode: bool = True):
         'farm_agent.tools.rag',      # RAG tool
         'farm_agent.tools.sheets',   # Sheets tool
         'farm_agent.llm',      # LLM interactions
-        'google_adk'           # ADK-specific
     ]
     for name in loggers:
         lg = logging.getLogger(name)
         # Clear existing handlers to prevent duplicates
-        lg.handlers.clear()
+        if lg.handlers:
+            lg.handlers.clear()
         lg.setLevel(logging.DEBUG if debug_mode else logging.INFO)
-        lg.addHandler(console_handler)
-        lg.propagate = False  # Prevent propagation to root to avoid duplication
+        lg.propagate = True  # children hand records up to 'farm_agent', which owns the handler
+    
+    # Only the application root holds a handler, so each record is dispatched exactly once
+    app_logger = logging.getLogger('farm_agent')
+    app_logger.addHandler(console_queue_handler)
+    app_logger.propagate = False  # Prevent propagation to root to avoid duplication
     
     # Enable Google ADK DEBUG logs on console
     adk_logger = logging.getLogger('google_adk')
-    adk_logger.handlers.clear()  # Clear existing handlers
+    if adk_logger.handlers:
+        adk_logger.handlers.clear()  # Clear existing handlers
     adk_logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
-    adk_logger.addHandler(console_handler)
+    adk_logger.addHandler(console_queue_handler)
     adk_logger.propagate = False
     
     # Configure loguru for file-only logging (no console duplication)
     loguru_logger.remove()  # Remove default console handler
-    loguru_logger.add("farm_agent_loguru.log", rotation="10 MB", retention="7 days", level="INFO")
-    
-    # Mark as configured to prevent duplicate setup
-    setup_logging._configured = True
-    
-    # Log setup completion
-    logging.getLogger('farm_agent').info(f"Logging setup complete (debug_mode={debug_mode})")
\ No newline at end of file
+    # enqueue=True hands records to loguru's writer thread, which also performs rotation, gzip
+    # compression and retention cleanup; backtrace/diagnose stay off so records never pay for
+    # frame introspection
+    loguru_logger.add(
+        "farm_agent_loguru.log", rotation="50 MB", retention="7 days", compression="gz", level="INFO",
+        enqueue=True, catch=True, buffering=8192, backtrace=False, diagnose=False
+    )
+    atexit.register(loguru_logger.remove)  # drain the queue and close the file on shutdown
\ No newline at end of file
@@ -59,6 +59,9 @@ def observe_if_available(name: Optional[str] = None):
     Falls back gracefully if Laminar is not available or not initialized.
     Handles both sync and async functions properly by avoiding pickle issues.
     
+    The check happens once, at decoration time: when Laminar is not initialized (or the
+    function is async) the original function is returned unwrapped, so calls pay nothing.
+    
     Args:
         name: Optional name for the span. If not provided, uses function name.
     
@@ -78,7 +81,7 @@ def observe_if_available(name: Optional[str] = None):
             if inspect.iscoroutinefunction(func):
                 # For async functions, we'll skip Laminar's observe decorator to avoid pickle issues
                 # Laminar's automatic instrumentation will still capture LLM calls within these functions
-                logger.debug(f"Skipping observe decorator for async function {func.__name__} (automatic instrumentation active)")
+                logger.debug("Skipping observe decorator for async function %s (automatic instrumentation active)", func.__name__)
                 return func
             else:
                 # For sync functions, apply Laminar observe safely
@@ -88,14 +91,14 @@ def observe_if_available(name: Optional[str] = None):
                     else:
                         return observe()(func)
                 except Exception as observe_error:
-                    logger.debug(f"Failed to apply observe decorator to {func.__name__}: {observe_error}")
+                    logger.debug("Failed to apply observe decorator to %s: %s", func.__name__, observe_error)
                     return func
                 
         except ImportError:
             logger.debug("Laminar not available, returning original function")
             return func
         except Exception as e:
-            logger.debug(f"Failed to apply observe decorator: {e}, returning original function")
+            logger.debug("Failed to apply observe decorator: %s, returning original function", e)
             return func
     
     return decorator
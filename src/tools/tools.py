@@ -1,28 +1,85 @@
 import asyncio
-from typing import Dict, Any
+import functools
+from typing import TYPE_CHECKING, Dict, Any, Optional, TypedDict, Union
 from google.adk.tools import FunctionTool
-from src.core.processors import weather_processor, market_price_processor, sheet_processor
+from src.core.processors import weather_processor, market_price_processor, sheet_processor, TTLCache, fetch_all_context
 from src.core.planning import sequential_planner, reflection_agent, farming_planner  # Import from planning.py
 from src.tools.utils import JsonUtils, VertexAIFactory, logger
 from src.config.config import config
-from vertexai import rag
-from vertexai.generative_models import GenerativeModel, Tool
-import vertexai
+from src.models.models import FarmerContext
 import logging
 from src.observability.observability import observe_if_available
 
+if TYPE_CHECKING:
+    # The Vertex SDK loads on the first RAG query, not when the agents are imported
+    from vertexai.generative_models import GenerativeModel
+
 
 rag_logger = logging.getLogger('farm_agent.tools.rag')
 
+# Response shapes of the data tools. They are plain dicts at runtime (ADK serializes them as-is);
+# each is built as a single dict literal, which CPython allocates at its final size
+class ToolError(TypedDict):
+    status: str
+    message: str
+
+class WeatherToolResponse(TypedDict):
+    status: str
+    location: str
+    temperature: float
+    condition: str
+    high: float
+    low: float
+    humidity: Optional[float]
+    wind_speed: Optional[float]
+
+class MarketPriceToolResponse(TypedDict):
+    status: str
+    commodity: str
+    market: str
+    state: str
+    price_modal: float
+    price_min: float
+    price_max: float
+    unit: str
+    arrival: Optional[str]
+
+class CustomerDataToolResponse(TypedDict):
+    status: str
+    customer_data: Dict[str, Any]
+
+def _err(message: str) -> ToolError:
+    """Build the error response every tool returns."""
+    return {"status": "error", "message": message}
+
+# Successful plans keyed by (planner, problem description, FarmerContext); the TTL keeps
+# weather- and market-dependent advice from going stale
+_plan_cache = TTLCache(config.cache_duration_plans, maxsize=128)
+
+def _extract_farmer_context(tool_context) -> Optional[FarmerContext]:
+    """Read farmer details from the tool's session state (None when there is no session state)."""
+    session_state = getattr(tool_context, 'session_state', None)
+    if not session_state:
+        return None
+    farmer_info = session_state.get("farmer_info", {})
+    return FarmerContext(
+        location=farmer_info.get("location", ""),
+        crop_type=tuple(farmer_info.get("crops", ())),
+        farm_size=farmer_info.get("farm_size", ""),
+        experience=farmer_info.get("experience", "intermediate")
+    )
+
 
 
 @observe_if_available(name="weather_tool")
 async def get_weather_tool(location: str, tool_context) -> Dict[str, Any]:
     """Get weather information for a location."""
-    weather_data = await weather_processor.get_weather_data(location)
-    
+    return _weather_result(location, await weather_processor.get_weather_data(location))
+
+def _weather_result(location: str, weather_data) -> Union[WeatherToolResponse, ToolError]:
+    """Shape weather data (or its absence) as a tool response."""
     if not weather_data:
-        return {"status": "error", "message": f"Could not retrieve weather for {location}"}
+        return _err(f"Could not retrieve weather for {location}")
     
     # Use JsonUtils for safe serialization if needed, but direct dict is fine
     return {
@@ -39,10 +96,12 @@ async def get_weather_tool(location: str, tool_context) -> Dict[str, Any]:
 @observe_if_available(name="market_price_tool")
 async def get_market_price_tool(crop_type: str, tool_context) -> Dict[str, Any]:
     """Get market prices for a crop."""
-    price_data = await market_price_processor.get_market_price(crop_type)
-    
+    return _market_price_result(crop_type, await market_price_processor.get_market_price(crop_type))
+
+def _market_price_result(crop_type: str, price_data) -> Union[MarketPriceToolResponse, ToolError]:
+    """Shape market price data (or its absence) as a tool response."""
     if not price_data:
-        return {"status": "error", "message": f"Could not find prices for {crop_type}"}
+        return _err(f"Could not find prices for {crop_type}")
     
     return {
         "status": "success",
@@ -59,51 +118,31 @@ async def get_market_price_tool(crop_type: str, tool_context) -> Dict[str, Any]:
 @observe_if_available(name="customer_data_tool")
 async def get_customer_data_tool(customer_id: str, tool_context) -> Dict[str, Any]:
     """Get customer data from Google Sheets."""
-    customer_data = await sheet_processor.get_customer_data(customer_id)
-    
+    return _customer_data_result(customer_id, await sheet_processor.get_customer_data(customer_id))
+
+def _customer_data_result(customer_id: str, customer_data) -> Union[CustomerDataToolResponse, ToolError]:
+    """Shape customer data (or its absence) as a tool response."""
     if not customer_data:
-        return {"status": "error", "message": f"Could not find customer data for ID: {customer_id}"}
+        return _err(f"Could not find customer data for ID: {customer_id}")
     
     return {
         "status": "success",
         "customer_data": customer_data
     }
 
-@observe_if_available(name="agricultural_rag_tool")
-async def get_agricultural_knowledge_tool(agricultural_query: str, tool_context) -> Dict[str, Any]:
-    """Get agricultural knowledge using RAG from the agricultural corpus."""
-    try:
-        # Initialize Vertex AI
-        VertexAIFactory.init_vertexai(config)
-        
-        # Note: Vertex AI may create internal HTTP sessions that we can't directly control
-        # The cleanup will be handled by our application-level cleanup functions
-        
-        # Configure RAG retrieval
-        rag_retrieval_config = rag.RagRetrievalConfig(
-            top_k=5,
-            filter=rag.Filter(vector_distance_threshold=0.4),
-        )
-        
-        # Create RAG retrieval tool
-        rag_retrieval_tool = Tool.from_retrieval(
-            retrieval=rag.Retrieval(
-                source=rag.VertexRagStore(
-                    rag_resources=[
-                        rag.RagResource(
-                            rag_corpus=config.vertexai.rag_corpus_name,
-                        )
-                    ],
-                    rag_retrieval_config=rag_retrieval_config,
-                ),
-            )
-        )
-        
-        # Create RAG-enhanced model
-        rag_model = VertexAIFactory.create_model(
-            model_name="gemini-2.0-flash-001",
-            tools=[rag_retrieval_tool],
-            system_instruction="""You are an expert agricultural advisor with access to comprehensive agricultural knowledge.
+@observe_if_available(name="farm_snapshot_tool")
+async def get_farm_snapshot_tool(location: str, crop_type: str, customer_id: str, tool_context) -> Dict[str, Any]:
+    """Get weather, market prices and customer data in one call, fetched concurrently."""
+    weather_data, price_data, customer_data = await fetch_all_context(location, crop_type, customer_id)
+    # A lookup that raised is reported like one that found nothing; the other two still return
+    return {
+        "status": "success",
+        "weather": _weather_result(location, None if isinstance(weather_data, BaseException) else weather_data),
+        "market_price": _market_price_result(crop_type, None if isinstance(price_data, BaseException) else price_data),
+        "customer": _customer_data_result(customer_id, None if isinstance(customer_data, BaseException) else customer_data)
+    }
+
+RAG_SYSTEM_INSTRUCTION = """You are an expert agricultural advisor with access to comprehensive agricultural knowledge.
 
 **Your Role:**
 - Provide detailed, practical farming advice based on retrieved agricultural knowledge
@@ -117,26 +156,80 @@ async def get_agricultural_knowledge_tool(agricultural_query: str, tool_context)
 - Provide step-by-step guidance when needed
 - Use clear, farmer-friendly language
 - Focus on Indian agricultural conditions and practices"""
+
+@functools.lru_cache(maxsize=1)
+def _get_rag_model() -> "GenerativeModel":
+    """Build the RAG retrieval tool and the model bound to it once per process."""
+    from vertexai import rag
+    from vertexai.generative_models import Tool
+
+    # Note: Vertex AI may create internal HTTP sessions that we can't directly control
+    # The cleanup will be handled by our application-level cleanup functions
+    
+    # Configure RAG retrieval
+    rag_retrieval_config = rag.RagRetrievalConfig(
+        top_k=5,
+        filter=rag.Filter(vector_distance_threshold=0.4),
+    )
+    
+    # Create RAG retrieval tool
+    rag_retrieval_tool = Tool.from_retrieval(
+        retrieval=rag.Retrieval(
+            source=rag.VertexRagStore(
+                rag_resources=[
+                    rag.RagResource(
+                        rag_corpus=config.vertexai.rag_corpus_name,
+                    )
+                ],
+                rag_retrieval_config=rag_retrieval_config,
+            ),
         )
+    )
+    
+    # Create RAG-enhanced model
+    return VertexAIFactory.create_model(
+        model_name="gemini-2.0-flash-001",
+        tools=[rag_retrieval_tool],
+        system_instruction=RAG_SYSTEM_INSTRUCTION
+    )
+
+def prewarm_vertexai() -> None:
+    """Initialize Vertex AI and open the RAG model's connection before the first query."""
+    try:
+        _get_rag_model().count_tokens("ping")
+        logger.info("Vertex AI prewarm complete")
+    except Exception as e:
+        logger.warning(f"Vertex AI prewarm failed, first query will pay the setup cost: {e}")
+
+@observe_if_available(name="agricultural_rag_tool")
+async def get_agricultural_knowledge_tool(agricultural_query: str, tool_context) -> Dict[str, Any]:
+    """Get agricultural knowledge using RAG from the agricultural corpus."""
+    try:
+        rag_model = _get_rag_model()
+        
+        # Request/response tracing only when debug logging is on, so nothing is formatted otherwise
+        debug_enabled = rag_logger.isEnabledFor(logging.DEBUG)
         
         # Generate RAG-enhanced response
-        rag_logger.debug("-----------------------------------------------------------")
-        rag_logger.debug("LLM Request to RAG model:")
-        rag_logger.debug(f"Model: gemini-2.0-flash-001")
-        rag_logger.debug(f"System Instruction: You are an expert agricultural advisor...")
-        rag_logger.debug(f"Query: {agricultural_query}")
-        rag_logger.debug("Tools: RAG retrieval tool enabled")
-        rag_logger.debug("-----------------------------------------------------------")
+        if debug_enabled:
+            rag_logger.debug("-----------------------------------------------------------")
+            rag_logger.debug("LLM Request to RAG model:")
+            rag_logger.debug("Model: gemini-2.0-flash-001")
+            rag_logger.debug("System Instruction: You are an expert agricultural advisor...")
+            rag_logger.debug("Query: %s", agricultural_query)
+            rag_logger.debug("Tools: RAG retrieval tool enabled")
+            rag_logger.debug("-----------------------------------------------------------")
         
         response = rag_model.generate_content(agricultural_query)
         
-        rag_logger.debug("-----------------------------------------------------------")
-        rag_logger.debug("LLM Response from RAG model:")
         if response and response.text:
-            rag_logger.debug(f"Response text: {response.text[:500]}...")
+            if debug_enabled:
+                rag_logger.debug("-----------------------------------------------------------")
+                rag_logger.debug("LLM Response from RAG model:")
+                rag_logger.debug("Response text: %s...", response.text[:500])
+                rag_logger.debug("-----------------------------------------------------------")
         else:
             rag_logger.warning("No response received from RAG model")
-        rag_logger.debug("-----------------------------------------------------------")
         
         if response and response.text:
             logger.info(f"RAG tool successfully processed query about: {agricultural_query[:50]}...")
@@ -147,35 +240,29 @@ async def get_agricultural_knowledge_tool(agricultural_query: str, tool_context)
                 "source": "RAG Agricultural Knowledge Base"
             }
         else:
-            return {
-                "status": "error", 
-                "message": "Could not generate response from agricultural knowledge base"
-            }
+            return _err("Could not generate response from agricultural knowledge base")
             
     except Exception as e:
         logger.error(f"Error in RAG agricultural knowledge tool: {e}")
-        return {
-            "status": "error",
-            "message": f"Error accessing agricultural knowledge: {str(e)}"
-        }
+        return _err(f"Error accessing agricultural knowledge: {e}")
 
 @observe_if_available(name="validated_farming_plan_tool")
 async def get_validated_farming_plan_tool(problem_description: str, tool_context) -> Dict[str, Any]:
     """Get a comprehensive, quality-validated farming plan using sequential planning+reflection."""
     
     # Extract context from tool_context if available
-    context = {}
-    if hasattr(tool_context, 'session_state') and tool_context.session_state:
-        farmer_info = tool_context.session_state.get("farmer_info", {})
-        context.update({
-            "location": farmer_info.get("location", ""),
-            "crop_type": farmer_info.get("crops", []),
-            "farm_size": farmer_info.get("farm_size", ""),
-            "experience": farmer_info.get("experience", "intermediate")
-        })
+    farmer = _extract_farmer_context(tool_context)
+    context = farmer.as_context() if farmer else {}
     
-    # Use sequential planning agent for comprehensive plan with quality validation
-    result = await sequential_planner.create_validated_agricultural_plan(problem_description, context)
+    cache_key = ("validated", problem_description, farmer)
+    result = _plan_cache.get(cache_key)
+    if result is None:
+        # Use sequential planning agent for comprehensive plan with quality validation
+        result = await sequential_planner.create_validated_agricultural_plan(problem_description, context)
+        if result["status"] == "success":
+            _plan_cache.set(cache_key, result)
+    else:
+        logger.debug("Using cached validated farming plan")
     
     if result["status"] == "success":
         return {
@@ -188,27 +275,24 @@ async def get_validated_farming_plan_tool(problem_description: str, tool_context
             "message": f"Quality-validated farming plan generated (Score: {result['quality_score']:.2f})"
         }
     else:
-        return {
-            "status": "error", 
-            "message": result.get("message", "Failed to create validated farming plan")
-        }
+        return _err(result.get("message", "Failed to create validated farming plan"))
 
 @observe_if_available(name="farming_plan_tool")
 async def get_farming_plan_tool(problem_description: str, tool_context) -> Dict[str, Any]:
     """Get a comprehensive farming plan for complex agricultural challenges."""
     
     # Extract context from tool_context if available
-    context = {}
-    if hasattr(tool_context, 'session_state') and tool_context.session_state:
-        farmer_info = tool_context.session_state.get("farmer_info", {})
-        context.update({
-            "location": farmer_info.get("location", ""),
-            "crop_type": farmer_info.get("crops", []),
-            "farm_size": farmer_info.get("farm_size", ""),
-            "experience": farmer_info.get("experience", "intermediate")
-        })
+    farmer = _extract_farmer_context(tool_context)
+    context = farmer.as_context() if farmer else {}
     
-    plan_result = await farming_planner.create_farming_plan(problem_description, context)
+    cache_key = ("plan", problem_description, farmer)
+    plan_result = _plan_cache.get(cache_key)
+    if plan_result is None:
+        plan_result = await farming_planner.create_farming_plan(problem_description, context)
+        if plan_result["status"] == "success":
+            _plan_cache.set(cache_key, plan_result)
+    else:
+        logger.debug("Using cached farming plan")
     
     if plan_result["status"] == "success":
         return {
@@ -217,24 +301,15 @@ async def get_farming_plan_tool(problem_description: str, tool_context) -> Dict[
             "message": "Comprehensive farming plan generated successfully"
         }
     else:
-        return {
-            "status": "error", 
-            "message": plan_result.get("message", "Failed to create farming plan")
-        }
+        return _err(plan_result.get("message", "Failed to create farming plan"))
 
 @observe_if_available(name="advice_quality_evaluation_tool")
 async def evaluate_advice_quality_tool(advice_text: str, tool_context) -> Dict[str, Any]:
     """Evaluate the quality of agricultural advice using reflection agent."""
     
     # Extract context for evaluation
-    context = {}
-    if hasattr(tool_context, 'session_state') and tool_context.session_state:
-        farmer_info = tool_context.session_state.get("farmer_info", {})
-        context.update({
-            "location": farmer_info.get("location", ""),
-            "crop_type": farmer_info.get("crops", []),
-            "experience": farmer_info.get("experience", "intermediate")
-        })
+    farmer = _extract_farmer_context(tool_context)
+    context = farmer.as_context(include_farm_size=False) if farmer else {}
     
     evaluation_result = await reflection_agent.evaluate_agricultural_advice(advice_text, context)
     
@@ -246,15 +321,13 @@ async def evaluate_advice_quality_tool(advice_text: str, tool_context) -> Dict[s
             "message": "Quality evaluation completed successfully"
         }
     else:
-        return {
-            "status": "error",
-            "message": evaluation_result.get("message", "Failed to evaluate advice quality")
-        }
+        return _err(evaluation_result.get("message", "Failed to evaluate advice quality"))
 
 # Agent Tools
 weather_tool = FunctionTool(get_weather_tool)
 market_price_tool = FunctionTool(get_market_price_tool)
 customer_data_tool = FunctionTool(get_customer_data_tool)
+farm_snapshot_tool = FunctionTool(get_farm_snapshot_tool)
 agricultural_knowledge_tool = FunctionTool(get_agricultural_knowledge_tool)
 validated_farming_plan_tool = FunctionTool(get_validated_farming_plan_tool)
 farming_plan_tool = FunctionTool(get_farming_plan_tool)
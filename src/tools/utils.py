@@ -1,56 +1,110 @@
-import json
+import functools
+import os
 import re
 import logging
-from typing import Dict, Any, Optional
+import threading
+from typing import TYPE_CHECKING, Dict, Any, Optional
 from datetime import datetime
 # Delayed import to avoid circular imports
 # from src.config.config import config
-import vertexai
-from vertexai.generative_models import GenerativeModel
+import msgspec
+import orjson
+
+if TYPE_CHECKING:
+    # The Vertex SDK is heavy to import; the factory loads it on first use
+    from vertexai.generative_models import GenerativeModel
 
 logger = logging.getLogger(__name__)
 
+# Set once vertexai.init() has succeeded in this process
+_VERTEX_INITIALIZED = False
+_VERTEX_INIT_LOCK = threading.Lock()
+
+_JSON_BLOCK_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
+def _extract_json_str(text: str) -> Optional[str]:
+    """Return the JSON payload of a model response, or None when it cannot contain JSON."""
+    if '```' in text:
+        match = _JSON_BLOCK_RE.search(text)
+        return match.group(1) if match else text
+    # No fence: only bare JSON objects/arrays are worth handing to a parser
+    return text if text.lstrip().startswith(('{', '[')) else None
+
 class JsonUtils:
     @staticmethod
     def extract_and_parse_json(text: str) -> Optional[Dict[str, Any]]:
         """Extract JSON from markdown or plain text (handles ```json blocks)."""
-        if not text:
+        json_str = _extract_json_str(text) if text else None
+        if json_str is None:
             return None
-        match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-        json_str = match.group(1) if match else text
         try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
+            return orjson.loads(json_str)
+        except orjson.JSONDecodeError as e:
             logger.warning(f"JSON parse failed: {e}")
             return None
 
+    @staticmethod
+    def extract_and_decode(text: str, schema: type) -> Optional[Dict[str, Any]]:
+        """Extract JSON and decode it against a msgspec schema (falls back to generic parsing)."""
+        json_str = _extract_json_str(text) if text else None
+        if json_str is None:
+            return None
+        try:
+            return msgspec.to_builtins(msgspec.json.decode(json_str, type=schema))
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            logger.debug("Typed JSON decode failed, using generic parser: %s", e)
+            return JsonUtils.extract_and_parse_json(text)
+
     @staticmethod
     def safe_dumps(data: Any) -> str:
         """Safely dump to JSON string."""
         try:
-            return json.dumps(data, indent=2, default=str)
-        except Exception as e:
+            return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+        except orjson.JSONEncodeError as e:
             logger.error(f"JSON dump failed: {e}")
             return str(data)
 
+def _build_model(model_name: str, system_instruction: str, tools=None) -> "GenerativeModel":
+    from vertexai.generative_models import GenerativeModel
+    return GenerativeModel(
+        model_name=model_name,
+        tools=tools,
+        system_instruction=system_instruction
+    )
+
+# Tool-free models are immutable configuration, so one instance per (model, instruction) is shared
+_cached_model = functools.lru_cache(maxsize=16)(_build_model)
+
 class VertexAIFactory:
     @staticmethod
     def init_vertexai(config):
-        """Initialize Vertex AI once (DRY)."""
-        try:
-            vertexai.init(project=config.vertexai.project_id, location=config.vertexai.location)
-        except Exception as e:
-            logger.debug(f"Vertex AI init skipped (already done): {e}")
+        """Initialize Vertex AI once (DRY); later calls return without touching the SDK."""
+        global _VERTEX_INITIALIZED
+        if _VERTEX_INITIALIZED:
+            return
+        with _VERTEX_INIT_LOCK:
+            if _VERTEX_INITIALIZED:
+                return
+            import vertexai
+            try:
+                vertexai.init(project=config.vertexai.project_id, location=config.vertexai.location)
+                _VERTEX_INITIALIZED = True
+            except Exception as e:
+                logger.debug("Vertex AI init skipped (already done): %s", e)
 
     @staticmethod
-    def create_model(system_instruction: str, model_name: str = None, tools=None) -> GenerativeModel:
-        """Factory for models (avoids repetition)."""
+    def create_model(system_instruction: str, model_name: str = None, tools=None) -> "GenerativeModel":
+        """
+        Factory for models (avoids repetition).
+        
+        Models without tools are memoized by (model_name, system_instruction); models with tools
+        are built fresh since tool objects are created per call. Set
+        FARM_AGENT_DISABLE_MODEL_CACHE=1 to always build a new model.
+        """
         # Import config here to avoid circular imports
         from src.config.config import config
         model_name = model_name or config.vertexai.model_name
         VertexAIFactory.init_vertexai(config)
-        return GenerativeModel(
-            model_name=model_name,
-            tools=tools,
-            system_instruction=system_instruction
-        )
\ No newline at end of file
+        if tools or os.environ.get("FARM_AGENT_DISABLE_MODEL_CACHE") == "1":
+            return _build_model(model_name, system_instruction, tools)
+        return _cached_model(model_name, system_instruction)
\ No newline at end of file
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from src.core import memory
+from src.core.memory import ConversationMemoryManager
+
+
+def _run_summaries(manager, batches):
+    async def scenario():
+        for batch in batches:
+            manager._schedule_summary(batch)
+        await manager._pending_summary
+
+    asyncio.run(scenario())
+
+
+def test_background_summaries_apply_in_conversation_order():
+    manager = ConversationMemoryManager()
+
+    def summarize(conversations):
+        # The older batch finishes last, so only the ordering in _summarize_in_background keeps it first
+        time.sleep(0.2 if conversations[0]["turn"] == 1 else 0)
+        return f"summary of turn {conversations[0]['turn']}"
+
+    manager._summarize_conversations = summarize
+    _run_summaries(manager, [[{"turn": 1}], [{"turn": 2}]])
+
+    assert manager.summarized_context == "summary of turn 1\n\nsummary of turn 2"
+    assert manager.version == 2
+
+
+def test_failed_summary_is_logged_and_later_summary_still_applies(monkeypatch):
+    errors = []
+    monkeypatch.setattr(memory._logger, "error", lambda msg, *args: errors.append(msg % args))
+    manager = ConversationMemoryManager()
+
+    def summarize(conversations):
+        if conversations[0]["turn"] == 1:
+            raise RuntimeError("model unavailable")
+        return "summary of turn 2"
+
+    manager._summarize_conversations = summarize
+    _run_summaries(manager, [[{"turn": 1}], [{"turn": 2}]])
+
+    assert manager.summarized_context == "summary of turn 2"
+    assert any("model unavailable" in message for message in errors)
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from src.core import processors
+from src.core.processors import InflightRequests, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable stand-in for time.monotonic as seen by the processors module."""
+    now = [1000.0]
+    monkeypatch.setattr(processors.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_returns_value_until_expiry(clock):
+    cache = TTLCache(ttl=10, maxsize=4)
+    cache.set("wheat", 2300)
+
+    clock[0] += 9.9
+    assert cache.get("wheat") == 2300
+
+    clock[0] += 0.1
+    assert cache.get("wheat") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("wheat", 1)
+    cache.set("rice", 2)
+    cache.get("wheat")  # wheat is now the most recently used
+    cache.set("cotton", 3)
+
+    assert cache.get("rice") is None
+    assert cache.get("wheat") == 1
+    assert cache.get("cotton") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_missing_key():
+    assert TTLCache(ttl=60).get("maize") is None
+
+
+def test_ttl_cache_disk_round_trip(tmp_path):
+    async def scenario():
+        writer = TTLCache(ttl=60, name="geocoding", cache_dir=str(tmp_path))
+        await writer.aset("ludhiana", (30.9, 75.85))
+
+        # A fresh instance (e.g. after a restart) starts empty in memory but finds the disk entry
+        reader = TTLCache(ttl=60, name="geocoding", cache_dir=str(tmp_path))
+        assert reader.get("ludhiana") is None
+        assert await reader.aget("ludhiana") == (30.9, 75.85)
+        assert reader.get("ludhiana") == (30.9, 75.85)  # promoted into memory
+
+    asyncio.run(scenario())
+
+
+def test_ttl_cache_without_cache_dir_stays_in_memory():
+    async def scenario():
+        await TTLCache(ttl=60, name="geocoding").aset("ludhiana", (30.9, 75.85))
+        return await TTLCache(ttl=60, name="geocoding").aget("ludhiana")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_inflight_requests_share_one_fetch():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"temperature": 31}
+
+    async def scenario():
+        inflight = InflightRequests()
+        results = await asyncio.gather(*(inflight.run("ludhiana", fetch) for _ in range(5)))
+        assert inflight._tasks == {}  # finished fetches are forgotten
+        # Once the first fetch has finished, the next call starts a new one
+        await inflight.run("ludhiana", fetch)
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [{"temperature": 31}] * 5
+    assert len(calls) == 2
+
+
+def test_inflight_requests_keep_keys_separate():
+    async def scenario():
+        inflight = InflightRequests()
+
+        async def fetch_for(key):
+            await asyncio.sleep(0)
+            return key
+
+        return await asyncio.gather(*(inflight.run(key, lambda key=key: fetch_for(key)) for key in ("pune", "nashik")))
+
+    assert asyncio.run(scenario()) == ["pune", "nashik"]
@@ -0,0 +1,94 @@
+from typing import List, Optional
+
+import msgspec
+
+from src.core.planning import EvaluationStruct
+from src.tools.utils import JsonUtils
+
+
+class Evaluation(msgspec.Struct):
+    overall_quality_score: float = 0.0
+    approval_status: Optional[str] = None
+    risk_flags: List[str] = []
+
+
+def test_extract_and_decode_fenced_json():
+    text = 'Here is my review:\n```json\n{"overall_quality_score": 0.82, "approval_status": "approved"}\n```\nThanks.'
+    assert JsonUtils.extract_and_decode(text, Evaluation) == {
+        "overall_quality_score": 0.82,
+        "approval_status": "approved",
+        "risk_flags": [],
+    }
+
+
+def test_extract_and_decode_unfenced_json():
+    text = '  {"overall_quality_score": 0.6, "risk_flags": ["late sowing"]}'
+    assert JsonUtils.extract_and_decode(text, Evaluation) == {
+        "overall_quality_score": 0.6,
+        "approval_status": None,
+        "risk_flags": ["late sowing"],
+    }
+
+
+def test_extract_and_decode_invalid_input():
+    assert JsonUtils.extract_and_decode("", Evaluation) is None
+    assert JsonUtils.extract_and_decode("The plan looks good overall.", Evaluation) is None
+    assert JsonUtils.extract_and_decode('```json\n{"overall_quality_score": 0.6,\n```', Evaluation) is None
+
+
+def test_extract_and_decode_falls_back_when_schema_does_not_match():
+    # A string score fails the typed decode; the generic parser still returns the payload as-is
+    text = '{"overall_quality_score": "high", "approval_status": "approved"}'
+    assert JsonUtils.extract_and_decode(text, Evaluation) == {
+        "overall_quality_score": "high",
+        "approval_status": "approved",
+    }
+
+
+# Keys SequentialPlanningAgent reads from a reflection result, with the fallbacks it reads them with
+_REFINEMENT_KEYS = {
+    "overall_quality_score": 0.0,
+    "approval_status": None,
+    "risk_flags": [],
+    "concerns": [],
+    "improvement_suggestions": [],
+}
+
+
+def test_extract_and_decode_reflection_payload():
+    text = """```json
+{
+    "overall_quality_score": 0.68,
+    "evaluation_summary": "Sound schedule, but the spray timing ignores forecast rain",
+    "dimension_scores": {"technical_accuracy": 0.8, "safety_assessment": 0.6, "practicality": 0.7, "completeness": 0.6},
+    "strengths": ["Clear irrigation schedule"],
+    "concerns": ["No pre-harvest interval for the pesticide"],
+    "improvement_suggestions": ["Move spraying after the forecast rain"],
+    "risk_flags": ["Spraying before rain washes off the pesticide"],
+    "approval_status": "needs_revision",
+    "revision_priority": "high",
+    "farmer_readiness": "Needs a revised spray date first"
+}
+```"""
+    evaluation = JsonUtils.extract_and_decode(text, EvaluationStruct)
+
+    assert set(_REFINEMENT_KEYS) <= evaluation.keys()
+    assert evaluation["overall_quality_score"] == 0.68
+    assert evaluation["approval_status"] == "needs_revision"
+    assert evaluation["risk_flags"] == ["Spraying before rain washes off the pesticide"]
+    assert evaluation["dimension_scores"]["safety_assessment"] == 0.6
+
+
+def test_extract_and_decode_reflection_payload_omits_defaults():
+    # omit_defaults drops empty fields; the refinement loop's .get() fallbacks must cover every one of them
+    text = '{"overall_quality_score": 0.9, "approval_status": "approved", "risk_flags": [], "concerns": []}'
+    evaluation = JsonUtils.extract_and_decode(text, EvaluationStruct)
+
+    assert evaluation == {"overall_quality_score": 0.9, "approval_status": "approved"}
+    assert {key: evaluation.get(key, default) for key, default in _REFINEMENT_KEYS.items()} == {
+        "overall_quality_score": 0.9,
+        "approval_status": "approved",
+        "risk_flags": [],
+        "concerns": [],
+        "improvement_suggestions": [],
+    }